@@ -34,6 +34,18 @@ logger = get_logger("API")
 
 router = APIRouter(prefix="/session", tags=["session"])
 
+try:
+    import orjson
+
+    def _dumps(obj, sort_keys: bool = False) -> str:
+        """Serialize an SSE payload with orjson (much faster than stdlib json)."""
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        return orjson.dumps(obj, default=str, option=option).decode()
+except ImportError:
+    def _dumps(obj, sort_keys: bool = False) -> str:
+        """Serialize an SSE payload with stdlib json (orjson not installed)."""
+        return json.dumps(obj, default=str, sort_keys=sort_keys)
+
 
 async def _render_video_background(
     session_id: str,
@@ -417,25 +429,27 @@ async def session_sse_stream(session_id: str):
                 "message": f"Session {session_id} not found"
             }
             # Yield with explicit newline to force flush
-            yield f"data: {json.dumps(error_event)}\n\n".encode('utf-8')
+            yield f"data: {_dumps(error_event)}\n\n".encode('utf-8')
             return
 
+        # One updater per connection: it caches the session behind a version
+        # check and tracks the delta cursors for incremental states
+        updater = None
+        last_version = None
+
         # Send initial session state
         try:
             updater = SessionUpdater(session_id)
             initial_state = updater.get_current_state()
+            last_version = initial_state.get("version")
             initial_event = {
                 "event": "session_connected",
                 "session_id": session_id,
                 "state": initial_state
             }
-            yield f"data: {json.dumps(initial_event)}\n\n".encode('utf-8')
+            yield f"data: {_dumps(initial_event)}\n\n".encode('utf-8')
         except Exception as e:
             logger.error(f"Error getting initial state: {e}")
-
-        # Track last known state to detect changes (using JSON serialization for deep comparison)
-        last_state_json = None
-        last_update_time = None
         last_heartbeat_time = datetime.utcnow()
         heartbeat_interval = 10  # Send heartbeat every 10 seconds if no updates
 
@@ -450,19 +464,18 @@ async def session_sse_stream(session_id: str):
                         "event": "session_deleted",
                         "session_id": session_id
                     }
-                    yield f"data: {json.dumps(error_event)}\n\n".encode('utf-8')
+                    yield f"data: {_dumps(error_event)}\n\n".encode('utf-8')
                     break
 
                 # Get current state
                 try:
-                    updater = SessionUpdater(session_id)
-                    current_state = updater.get_current_state()
-
-                    # Serialize state for comparison
-                    current_state_json = json.dumps(current_state, sort_keys=True, default=str)
+                    if updater is None:
+                        updater = SessionUpdater(session_id)
+                    current_state = updater.get_current_state(since=last_version)
 
-                    # Check if state changed (compare JSON strings or updated_at timestamp)
-                    state_changed = current_state_json != last_state_json or session.updated_at != last_update_time
+                    # The version bump check replaces the old full-payload
+                    # JSON comparison; unchanged ticks cost one int compare
+                    state_changed = current_state.get("changed", True)
 
                     # Send heartbeat if no updates for heartbeat_interval seconds
                     now = datetime.utcnow()
@@ -514,10 +527,9 @@ async def session_sse_stream(session_id: str):
                             "timestamp": datetime.utcnow().isoformat(),
                             "state": current_state
                         }
-                        yield f"data: {json.dumps(update_event)}\n\n".encode('utf-8')
+                        yield f"data: {_dumps(update_event)}\n\n".encode('utf-8')
 
-                        last_state_json = current_state_json
-                        last_update_time = session.updated_at
+                        last_version = current_state.get("version")
                         last_heartbeat_time = now  # Reset heartbeat timer on state change
 
                         # Check if session is in a terminal state
@@ -551,7 +563,7 @@ async def session_sse_stream(session_id: str):
                                 "session_id": session_id,
                                 "message": "Session complete"
                             }
-                            yield f"data: {json.dumps(done_event)}\n\n".encode('utf-8')
+                            yield f"data: {_dumps(done_event)}\n\n".encode('utf-8')
                             break
 
                     elif should_send_heartbeat:
@@ -561,11 +573,11 @@ async def session_sse_stream(session_id: str):
                             "event": "heartbeat",
                             "session_id": session_id,
                             "timestamp": now.isoformat(),
-                            "status": current_state.get("status"),
+                            "status": session.status,
                             "message": "Keepalive - session is still processing"
                         }
                         # Encode to bytes to ensure immediate transmission (prevents buffering)
-                        yield f"data: {json.dumps(heartbeat_event)}\n\n".encode('utf-8')
+                        yield f"data: {_dumps(heartbeat_event)}\n\n".encode('utf-8')
                         last_heartbeat_time = now
                         logger.debug(f"Sent heartbeat for session {session_id}")
 
@@ -576,7 +588,7 @@ async def session_sse_stream(session_id: str):
                         "session_id": session_id,
                         "error": str(e)
                     }
-                    yield f"data: {json.dumps(error_event)}\n\n".encode('utf-8')
+                    yield f"data: {_dumps(error_event)}\n\n".encode('utf-8')
 
                 # Poll interval - use shorter interval for more responsive updates
                 await asyncio.sleep(0.2)
@@ -591,7 +603,7 @@ async def session_sse_stream(session_id: str):
                 "session_id": session_id,
                 "error": str(e)
             }
-            yield f"data: {json.dumps(error_event)}\n\n".encode('utf-8')
+            yield f"data: {_dumps(error_event)}\n\n".encode('utf-8')
 
     return StreamingResponse(
         event_generator(),
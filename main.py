@@ -31,6 +31,40 @@ logger.info(f"LiteLLM logging level set to: {litellm_log_level}")
 
 app = FastAPI(title="Manim GPT - AI-Powered Video Generation API")
 
+
+@app.on_event("startup")
+async def warm_manim():
+    """
+    Warm OS caches for the manim toolchain before the first render.
+
+    `python -m manim --version` pulls the interpreter and the heavy
+    manim/numpy/cairo imports into the page cache, so the first real
+    render pays steady-state import cost instead of a cold one.
+    Fire-and-forget: failures only cost the warm-up. The task is pinned
+    on app.state (the event loop keeps only weak references to tasks,
+    so a bare create_task could be garbage-collected mid-flight) and
+    unpinned by its done callback.
+    """
+    import asyncio
+    import subprocess
+    import sys
+
+    async def _warm():
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "manim", "--version",
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            await process.wait()
+            logger.info("Manim toolchain warm-up complete")
+        except Exception as e:
+            logger.warning(f"Manim warm-up failed: {e}")
+
+    task = asyncio.create_task(_warm())
+    app.state.manim_warm_task = task
+    task.add_done_callback(lambda t: setattr(app.state, "manim_warm_task", None))
+
 # Add CORS middleware to allow frontend requests
 app.add_middleware(
     CORSMiddleware,
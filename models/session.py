@@ -1,8 +1,8 @@
 """
 Session models for iterative code generation and refinement.
 """
-from pydantic import BaseModel, Field
-from typing import Optional, List, Literal
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Dict, Optional, List, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -89,6 +89,12 @@ class SessionState(BaseModel):
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 0  # Bumped on every update_session; used for staleness checks
+
+    # Transient index mapping iteration_number -> position in `iterations`.
+    # Private attrs are not serialized, so it is rebuilt lazily after a
+    # session is loaded from storage.
+    _iter_index: Dict[int, int] = PrivateAttr(default_factory=dict)
 
 
 class IterativeGenerationRequest(BaseModel):
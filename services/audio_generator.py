@@ -58,22 +58,31 @@ PIPER_VOICE_MODELS = {
 # Cache for loaded Piper voice models
 _voice_cache = {}
 
+# Cached result of the Piper import probe; whether the package is
+# installed can't change within a running process
+_pipertts_available: Optional[bool] = None
+
 
 async def check_pipertts_available() -> bool:
     """
-    Check if Piper TTS is available and can be imported.
+    Check if Piper TTS is available and can be imported (cached per process).
 
     Returns:
         bool: True if Piper TTS is available, False otherwise
     """
+    global _pipertts_available
+    if _pipertts_available is not None:
+        return _pipertts_available
+
     try:
         import piper
         logger.info("Piper TTS is available")
-        return True
+        _pipertts_available = True
     except ImportError:
         logger.error("Piper TTS is not installed")
         logger.error("Install with: pip install piper-tts")
-        return False
+        _pipertts_available = False
+    return _pipertts_available
 
 
 def get_available_speakers(language: str = "EN") -> Dict[int, str]:
@@ -403,41 +412,55 @@ async def generate_audio_from_segments(
     temp_dir.mkdir(exist_ok=True)
 
     try:
-        audio_segments = []
-
-        # Generate audio for each segment
-        for idx, segment in enumerate(segments, start=1):
-            text = segment['text']
-            target_duration = segment['duration']
-
-            logger.info(f"Processing segment {idx}/{len(segments)}: '{text[:50]}...' ({target_duration}s)")
-            emit_progress("generating_audio", f"Processing segment {idx}/{len(segments)}")
-
-            # Generate audio chunk
-            chunk_path = str(temp_dir / f"segment_{idx:03d}.wav")
-            await generate_audio_chunk(
-                text=text,
-                output_path=chunk_path,
-                speaker_id=speaker_id,
-                language=language,
-                speed=base_speed
-            )
-
-            # Adjust to match target duration
-            adjusted_path = str(temp_dir / f"segment_{idx:03d}_adjusted.wav")
-            await adjust_audio_duration(
-                audio_path=chunk_path,
-                target_duration=target_duration,
-                output_path=adjusted_path
-            )
-
-            # Load adjusted segment
-            audio_segment = AudioSegment.from_wav(adjusted_path)
-            audio_segments.append(audio_segment)
-
-            # Clean up intermediate files
-            if os.path.exists(chunk_path):
-                os.remove(chunk_path)
+        # The same voice model serves every segment; resolve the download
+        # once up front so parallel workers don't race to fetch it
+        await download_voice_model(language, speaker_id)
+
+        # Per-segment synthesis is independent, so run it on a bounded pool;
+        # Piper inference happens in executor threads and scales with cores
+        semaphore = asyncio.Semaphore(max(1, min(4, (os.cpu_count() or 2) // 2)))
+        completed = 0
+
+        async def _render_segment(idx: int, segment: Dict) -> str:
+            nonlocal completed
+            async with semaphore:
+                text = segment['text']
+                target_duration = segment['duration']
+
+                logger.info(f"Processing segment {idx}/{len(segments)}: '{text[:50]}...' ({target_duration}s)")
+
+                # Generate audio chunk
+                chunk_path = str(temp_dir / f"segment_{idx:03d}.wav")
+                await generate_audio_chunk(
+                    text=text,
+                    output_path=chunk_path,
+                    speaker_id=speaker_id,
+                    language=language,
+                    speed=base_speed
+                )
+
+                # Adjust to match target duration
+                adjusted_path = str(temp_dir / f"segment_{idx:03d}_adjusted.wav")
+                await adjust_audio_duration(
+                    audio_path=chunk_path,
+                    target_duration=target_duration,
+                    output_path=adjusted_path
+                )
+
+                # Clean up intermediate files
+                if os.path.exists(chunk_path):
+                    os.remove(chunk_path)
+
+                completed += 1
+                emit_progress("generating_audio", f"Synthesized segment {completed}/{len(segments)}")
+                return adjusted_path
+
+        # gather preserves submission order, so segments concatenate in
+        # narration order no matter which finishes first
+        adjusted_paths = await asyncio.gather(
+            *(_render_segment(idx, seg) for idx, seg in enumerate(segments, start=1))
+        )
+        audio_segments = [AudioSegment.from_wav(path) for path in adjusted_paths]
 
         # Concatenate all segments
         logger.info("Concatenating all audio segments")
@@ -1,4 +1,4 @@
-from litellm import acompletion
+from services.llm import llm_acompletion
 
 
 async def generate_manim_code(prompt: str, model: str, max_tokens: int, temperature: float) -> tuple[str, str]:
@@ -36,7 +36,7 @@ class GeneratedScene(Scene):
 
 Generate clean, working Manim code based on the user's request."""
 
-    response = await acompletion(
+    response = await llm_acompletion(
         model=model,
         messages=[
             {"role": "system", "content": system_prompt},
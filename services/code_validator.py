@@ -4,6 +4,8 @@ Validates syntax and runs Manim dry-run to catch errors.
 """
 import ast
 import asyncio
+import os
+import signal
 import sys
 import tempfile
 from pathlib import Path
@@ -166,11 +168,16 @@ async def validate_manim_dry_run(
             "GeneratedScene"
         ]
 
+        # close_fds=False keeps the spawn on CPython's posix_spawn fast path
+        # (no FD-close loop in the child); start_new_session puts manim and
+        # anything it spawns (latex, ffmpeg) in one killable process group
         process = await asyncio.create_subprocess_exec(
             *cmd,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
-            cwd=project_root
+            cwd=project_root,
+            close_fds=False,
+            start_new_session=True
         )
 
         # Stream output in real-time
@@ -253,14 +260,22 @@ async def validate_manim_dry_run(
         if process and process.returncode is None:
             try:
                 logger.info("Terminating validation subprocess...")
-                process.terminate()
+                # Signal the whole process group so manim's own children
+                # (latex, ffmpeg) don't outlive it as orphans
+                try:
+                    os.killpg(process.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
                 try:
                     # Wait briefly for graceful termination
                     await asyncio.wait_for(process.wait(), timeout=5.0)
                 except asyncio.TimeoutError:
                     # Force kill if it doesn't terminate gracefully
                     logger.warning("Force killing validation subprocess...")
-                    process.kill()
+                    try:
+                        os.killpg(process.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
                     await process.wait()
             except Exception as cleanup_error:
                 logger.error(f"Error during subprocess cleanup: {cleanup_error}")
@@ -1,17 +1,23 @@
 """
 LangGraph workflow for iterative Manim code generation and refinement.
 """
-from typing import TypedDict, Annotated, Sequence, Callable, Optional, Any
+from typing import TypedDict, Annotated, Sequence, Callable, Final, Optional, Any
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
+from uuid import uuid4
+import hashlib
 import operator
 import asyncio
+import re
 import time
 
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
-from litellm import acompletion
 from services.code_validator import validate_code
+from services.llm import llm_stream_completion
+from services.llm_cache import llm_cache
 from models.session import IterationStatus, CodeIteration, GenerationMetrics, ValidationMetrics
 from utils.logger import get_logger
 
@@ -21,40 +27,27 @@ logger_validate = get_logger("Validate")
 logger_decide = get_logger("Decide")
 logger_complete = get_logger("Complete")
 logger_max_iter = get_logger("MaxIterations")
-logger_refine = get_logger("Refine")
 logger_workflow = get_logger("Workflow")
 
+# Precompiled pattern for stripping markdown code fences from LLM output.
+# One alternation covers leading, trailing and interior fences, so cleanup
+# is a single C-level pass over the generated code.
+_FENCE_RE = re.compile(
+    r'\A\s*```(?:python|py)?\s*\n'      # leading fence
+    r'|\n?```\s*\Z'                     # trailing fence
+    r'|^\s*```(?:python|py)?\s*$\n?',   # interior fence lines
+    re.MULTILINE
+)
 
-class WorkflowState(TypedDict):
-    """State that gets passed between nodes in the workflow."""
-    session_id: str
-    prompt: str
-    model: str
-    temperature: float
-    max_tokens: int
-    max_iterations: int
-    current_iteration: int
-    messages: Annotated[Sequence[BaseMessage], operator.add]
-    generated_code: str | None
-    validation_result: dict | None
-    iterations_history: list[CodeIteration]
-    status: IterationStatus
-    error_message: str | None
-    # Metrics for current iteration
-    generation_metrics: GenerationMetrics | None
-    validation_metrics: ValidationMetrics | None
 
+def _strip_code_fences(text: str) -> str:
+    """Remove leading/trailing/interior markdown code fences from LLM output."""
+    return _FENCE_RE.sub('', text).strip()
 
-async def generate_code_node(state: WorkflowState) -> dict:
-    """
-    Node that generates Manim code using LLM.
-    For first iteration, uses the original prompt.
-    For refinements, includes error feedback.
-    """
-    logger_generate.info(f"Iteration {state['current_iteration'] + 1}")
 
-    # Build system prompt
-    system_prompt = """You are an expert Manim (Mathematical Animation Engine) programmer.
+# Static system prompt, built once at import time. A stable byte-identical
+# prompt also lets provider-side prompt caches hit across iterations/sessions.
+_SYSTEM_PROMPT: Final[str] = """You are an expert Manim (Mathematical Animation Engine) programmer.
 Generate complete, working Manim code based on the user's request.
 
 IMPORTANT REQUIREMENTS:
@@ -90,8 +83,122 @@ Common issues to avoid:
 
 Generate clean, working Manim code."""
 
+# Stop sequences passed to the provider. The system prompt forbids markdown,
+# so a closing fence means the code is done and anything after it (trailing
+# explanation, "I hope this helps") is wasted output tokens - stopping
+# server-side trims both latency and cost.
+_STOP_SEQUENCES: Final[list[str]] = ["\n```\n", "\n```python", "```\n\n"]
+
+
+def _system_message(model: str) -> dict:
+    """
+    Build the system message for the given model.
+
+    Anthropic models get the structured content form with cache_control so
+    the provider serves prefix-KV-cache hits on the static prompt across
+    iterations and sessions. Other providers (e.g. OpenAI) cache verbatim
+    prefixes automatically, so the plain string form is already optimal.
+    """
+    if "anthropic" in model or "claude" in model:
+        return {
+            "role": "system",
+            "content": [{
+                "type": "text",
+                "text": _SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        }
+    return {"role": "system", "content": _SYSTEM_PROMPT}
+
+
+class WorkflowState(TypedDict):
+    """State that gets passed between nodes in the workflow."""
+    session_id: str
+    prompt: str
+    model: str
+    temperature: float
+    max_tokens: int
+    max_iterations: int
+    current_iteration: int
+    # Number of candidate completions generated per iteration (best-of-N)
+    candidates_per_iteration: int
+    messages: Annotated[Sequence[BaseMessage], operator.add]
+    generated_code: str | None
+    # All candidate codes from the current iteration (len 1 when N=1)
+    candidate_codes: list[str] | None
+    validation_result: dict | None
+    # Reducer: nodes return only the newly appended records (same pattern as
+    # `messages`), avoiding a full list copy on every validation step.
+    iterations_history: Annotated[list[CodeIteration], operator.add]
+    status: IterationStatus
+    error_message: str | None
+    # Metrics for current iteration
+    generation_metrics: GenerationMetrics | None
+    validation_metrics: ValidationMetrics | None
+
+
+async def generate_code_node(state: WorkflowState) -> dict:
+    """
+    Node that generates Manim code using LLM.
+    For first iteration, uses the original prompt.
+    For refinements, includes error feedback.
+    """
+    logger_generate.info("Iteration {}", state["current_iteration"] + 1)
+
+    # Use the prefetched speculative refinement if one was started during the
+    # previous validation - its LLM latency already overlapped the dry-run
+    if state["current_iteration"] > 0:
+        spec_task = _SPECULATIVE_REFINEMENTS.pop(state["session_id"], None)
+        if spec_task is not None:
+            start_time = time.perf_counter()
+            try:
+                content, usage = await spec_task
+            except Exception as e:
+                logger_generate.warning("Speculative refinement failed ({}); generating normally", e)
+            else:
+                generated_code = _strip_code_fences(content.strip())
+                if generated_code:
+                    time_taken = time.perf_counter() - start_time
+                    generation_metrics = GenerationMetrics(
+                        time_taken=time_taken,
+                        prompt_tokens=getattr(usage, 'prompt_tokens', None) if usage else None,
+                        completion_tokens=getattr(usage, 'completion_tokens', None) if usage else None,
+                        total_tokens=getattr(usage, 'total_tokens', None) if usage else None,
+                        model=state["model"]
+                    )
+                    logger_generate.info("Used speculative refinement ({} chars, waited {:.2f}s)", len(generated_code), time_taken)
+                    return {
+                        "generated_code": generated_code,
+                        "candidate_codes": [generated_code],
+                        "messages": [HumanMessage(content=_speculative_refine_prompt(
+                            state["prompt"], state["iterations_history"][-1].generated_code))],
+                        "status": IterationStatus.REFINING,
+                        "generation_metrics": generation_metrics
+                    }
+
     # Build user message based on iteration
     if state["current_iteration"] == 0:
+        # Check the cross-session cache for an exact repeat of this request
+        cached = llm_cache.get(state["model"], state["prompt"], state["temperature"])
+        if cached is not None:
+            generated_code = cached["generated_code"]
+            # Seed the validation cache so validate_code_node skips the dry-run
+            _VAL_CACHE[hashlib.sha256(generated_code.encode()).digest()] = cached["validation_result"]
+            logger_generate.info("LLM cache hit - skipping completion ({} chars)", len(generated_code))
+            return {
+                "generated_code": generated_code,
+                "candidate_codes": [generated_code],
+                "messages": [HumanMessage(content=state["prompt"])],
+                "status": IterationStatus.VALIDATING,
+                "generation_metrics": GenerationMetrics(
+                    time_taken=0.0,
+                    prompt_tokens=0,
+                    completion_tokens=0,
+                    total_tokens=0,
+                    model=state["model"]
+                )
+            }
+
         # First iteration - use original prompt
         user_message = state["prompt"]
     else:
@@ -102,43 +209,90 @@ Generate clean, working Manim code."""
         error_info = "\n".join(validation.get("errors", []))
         warnings_info = "\n".join(validation.get("warnings", []))
 
-        user_message = f"""The previous code had errors. Please fix them and generate corrected code.
-
-ORIGINAL REQUEST: {state['prompt']}
-
-PREVIOUS CODE:
-```python
-{last_iteration.generated_code}
-```
-
-ERRORS FOUND:
-{error_info}
-
-{f'WARNINGS: {warnings_info}' if warnings_info else ''}
-
-Please generate corrected Manim code that fixes these issues."""
-
-    # Call LLM and track time
-    start_time = time.time()
-    response = await acompletion(
-        model=state["model"],
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ],
-        max_tokens=state["max_tokens"],
-        temperature=state["temperature"],
-    )
-    end_time = time.time()
+        # Assemble with a single join - the previous code can be multi-KB,
+        # and f-string interpolation would rebuild it through intermediates
+        parts = [
+            "The previous code had errors. Please fix them and generate corrected code.\n\n",
+            "ORIGINAL REQUEST: ", state["prompt"],
+            "\n\nPREVIOUS CODE:\n```python\n", last_iteration.generated_code,
+            "\n```\n\nERRORS FOUND:\n", error_info, "\n"
+        ]
+        if warnings_info:
+            parts += ["\nWARNINGS: ", warnings_info, "\n"]
+        parts.append("\nPlease generate corrected Manim code that fixes these issues.")
+        user_message = "".join(parts)
+
+    # Call LLM and track time. With N > 1, fire all candidate completions
+    # concurrently (best-of-N) - one round-trip of wall-clock time instead
+    # of serial refinement attempts. Slightly staggered temperatures keep
+    # the candidates from collapsing to the same output.
+    n_candidates = max(1, state.get("candidates_per_iteration", 1))
+    start_time = time.perf_counter()
+
+    # Coalesce concurrent identical first-iteration requests: the second
+    # submission awaits the first one's future instead of issuing its own
+    # provider calls.
+    coalesce_key = None
+    owned_future = None
+    results = None
+    if state["current_iteration"] == 0:
+        coalesce_key = hashlib.blake2b(
+            f"{state['prompt']}\x00{state['model']}\x00{state['temperature']}".encode(),
+            digest_size=16
+        ).hexdigest()
+        pending = _INFLIGHT.get(coalesce_key)
+        if pending is not None:
+            logger_generate.info("Identical generation already in flight - coalescing")
+            results = await asyncio.shield(pending)
+        else:
+            owned_future = asyncio.get_running_loop().create_future()
+            _INFLIGHT[coalesce_key] = owned_future
+
+    if results is None:
+        try:
+            raw_results = await asyncio.gather(
+                *[
+                    llm_stream_completion(
+                        model=state["model"],
+                        messages=[
+                            _system_message(state["model"]),
+                            {"role": "user", "content": user_message}
+                        ],
+                        max_tokens=state["max_tokens"],
+                        temperature=state["temperature"] + 0.1 * i,
+                        stop=_STOP_SEQUENCES,
+                    )
+                    for i in range(n_candidates)
+                ],
+                return_exceptions=True
+            )
+            # Keep successful responses; only fail if every candidate failed
+            failures = [r for r in raw_results if isinstance(r, BaseException)]
+            results = [r for r in raw_results if not isinstance(r, BaseException)]
+            if not results:
+                raise failures[0]
+            if failures:
+                logger_generate.warning("{}/{} candidate generations failed", len(failures), n_candidates)
+        except BaseException as e:
+            if owned_future is not None:
+                _INFLIGHT.pop(coalesce_key, None)
+                owned_future.set_exception(e)
+            raise
+        if owned_future is not None:
+            _INFLIGHT.pop(coalesce_key, None)
+            owned_future.set_result(results)
+
+    end_time = time.perf_counter()
     time_taken = end_time - start_time
 
-    generated_code = response.choices[0].message.content.strip()
+    candidate_codes = [_strip_code_fences(content.strip()) for content, _ in results]
+    generated_code = candidate_codes[0]
 
-    # Extract token usage from response
-    usage = response.usage if hasattr(response, 'usage') else None
-    prompt_tokens = usage.prompt_tokens if usage and hasattr(usage, 'prompt_tokens') else None
-    completion_tokens = usage.completion_tokens if usage and hasattr(usage, 'completion_tokens') else None
-    total_tokens = usage.total_tokens if usage and hasattr(usage, 'total_tokens') else None
+    # Token usage for the primary candidate (from the final stream chunk)
+    usage = results[0][1]
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    total_tokens = getattr(usage, "total_tokens", None)
 
     # Create generation metrics
     generation_metrics = GenerationMetrics(
@@ -149,40 +303,92 @@ Please generate corrected Manim code that fixes these issues."""
         model=state["model"]
     )
 
-    # Clean up markdown formatting - be aggressive about removing code fences
-    # Remove starting markers
-    if generated_code.startswith("```python"):
-        generated_code = generated_code[len("```python"):].strip()
-    elif generated_code.startswith("```"):
-        generated_code = generated_code[3:].strip()
-
-    # Remove ending markers
-    if generated_code.endswith("```"):
-        generated_code = generated_code[:-3].strip()
-
-    # Remove any remaining code fence markers in the middle or end
-    lines = generated_code.split('\n')
-    cleaned_lines = []
-    for line in lines:
-        # Skip lines that are just code fence markers
-        if line.strip() in ['```', '```python', '```py']:
-            continue
-        cleaned_lines.append(line)
-
-    generated_code = '\n'.join(cleaned_lines).strip()
-
-    logger_generate.info(f"Generated {len(generated_code)} characters of code in {time_taken:.2f}s")
+    logger_generate.info("Generated {} candidate(s) ({} chars primary) in {:.2f}s", len(candidate_codes), len(generated_code), time_taken)
     if total_tokens:
-        logger_generate.info(f"Token usage: {total_tokens} total ({prompt_tokens} prompt + {completion_tokens} completion)")
+        logger_generate.info("Token usage: {} total ({} prompt + {} completion)", total_tokens, prompt_tokens, completion_tokens)
 
     return {
         "generated_code": generated_code,
+        "candidate_codes": candidate_codes,
         "messages": [HumanMessage(content=user_message)],
-        "status": IterationStatus.VALIDATING,
+        # Refinement status is set here since the refine node was folded away
+        "status": IterationStatus.REFINING if state["current_iteration"] > 0 else IterationStatus.VALIDATING,
         "generation_metrics": generation_metrics
     }
 
 
+# First-iteration generations currently in flight, keyed by request hash.
+# Concurrent identical submissions await the same future instead of each
+# paying for their own provider calls.
+_INFLIGHT: dict[str, asyncio.Future] = {}
+
+
+# Speculative refinement tasks keyed by session_id. validate_code_node starts
+# one while validation runs; generate_code_node consumes it on the next
+# refinement pass (or it is cancelled if validation succeeds). The run_*
+# entry points discard any leftover entry in a finally block, so a workflow
+# that errors or is cancelled between stash and consume cannot leak its task.
+_SPECULATIVE_REFINEMENTS: dict[str, asyncio.Task] = {}
+
+
+def _discard_speculative(session_id: str) -> None:
+    """
+    Drop and cancel any speculative refinement left over for a session.
+
+    Cancelling (rather than just popping) also consumes the task's result,
+    so an already-failed task does not log "exception was never retrieved".
+    """
+    spec_task = _SPECULATIVE_REFINEMENTS.pop(session_id, None)
+    if spec_task is not None:
+        spec_task.cancel()
+
+
+def _speculative_refine_prompt(prompt: str, code: str) -> str:
+    """Generic refinement prompt used before real validation errors are known."""
+    return "".join([
+        "The previous code may have errors (validation is still running). ",
+        "Review it carefully and generate a corrected, improved version.\n\n",
+        "ORIGINAL REQUEST: ", prompt,
+        "\n\nPREVIOUS CODE:\n```python\n", code,
+        "\n```\n\nFix any syntax errors, missing imports, invalid Manim API usage, ",
+        "or undefined variables, and return the full corrected code."
+    ])
+
+
+# Validation results memoized by content hash. Refinement loops sometimes
+# regenerate byte-identical code, and validation pays a full Manim dry-run
+# (subprocess spawn) each time - a cache hit skips all of that.
+_VAL_CACHE: OrderedDict[bytes, dict] = OrderedDict()
+_VAL_CACHE_MAX = 512
+
+
+async def _cached_validate(code: str) -> dict:
+    """Validate code, reusing the cached result for previously seen code."""
+    key = hashlib.sha256(code.encode()).digest()
+    if key in _VAL_CACHE:
+        _VAL_CACHE.move_to_end(key)
+        return _VAL_CACHE[key]
+    result = await validate_code(code, dry_run=True)
+    _VAL_CACHE[key] = result
+    if len(_VAL_CACHE) > _VAL_CACHE_MAX:
+        _VAL_CACHE.popitem(last=False)
+    return result
+
+
+async def _validate_candidates(candidates: list[str]) -> tuple[str, dict]:
+    """
+    Validate candidate codes concurrently and pick the best one.
+
+    Returns the first candidate that passes validation, or the one with the
+    fewest errors if none do.
+    """
+    results = await asyncio.gather(*[_cached_validate(c) for c in candidates])
+    for code, result in zip(candidates, results):
+        if result["is_valid"]:
+            return code, result
+    return min(zip(candidates, results), key=lambda pair: len(pair[1].get("errors", [])))
+
+
 async def validate_code_node(state: WorkflowState) -> dict:
     """
     Node that validates the generated Manim code.
@@ -192,9 +398,10 @@ async def validate_code_node(state: WorkflowState) -> dict:
     We ensure the session is updated before validation starts so SSE clients
     don't time out waiting for updates.
     """
-    logger_validate.info(f"Validating code for iteration {state['current_iteration'] + 1}")
+    logger_validate.info("Validating code for iteration {}", state["current_iteration"] + 1)
 
     code = state["generated_code"]
+    candidates = state.get("candidate_codes") or [code]
 
     # Import here to avoid circular dependency
     from services.session_updater import SessionUpdater
@@ -215,24 +422,44 @@ async def validate_code_node(state: WorkflowState) -> dict:
         logger_validate.warning(f"Failed to update session before validation: {e}")
 
     # Track validation time
-    start_time = time.time()
+    start_time = time.perf_counter()
 
     # Run validation with periodic heartbeat updates to keep session alive
-    # This prevents the session from appearing stuck during long validations
-    validation_task = asyncio.create_task(validate_code(code, dry_run=True))
-    last_heartbeat = time.time()
+    # This prevents the session from appearing stuck during long validations.
+    # All candidates are validated concurrently and the best one is kept.
+    validation_task = asyncio.create_task(_validate_candidates(candidates))
+
+    # Speculative refinement: while the (slow) dry-run validates, start a
+    # generic refinement completion so provider latency overlaps it. If the
+    # code turns out valid the task is cancelled - worst case pays one
+    # discarded completion, best case hides a whole generation round-trip.
+    if state["current_iteration"] + 1 < state["max_iterations"]:
+        _SPECULATIVE_REFINEMENTS[state["session_id"]] = asyncio.create_task(
+            llm_stream_completion(
+                model=state["model"],
+                messages=[
+                    _system_message(state["model"]),
+                    {"role": "user", "content": _speculative_refine_prompt(state["prompt"], code)}
+                ],
+                max_tokens=state["max_tokens"],
+                temperature=state["temperature"],
+                stop=_STOP_SEQUENCES,
+            )
+        )
+
+    last_heartbeat = time.perf_counter()
     heartbeat_interval = 5.0  # Update session every 5 seconds during validation
 
     # Poll validation task and send periodic updates
     while not validation_task.done():
         try:
             # Wait for task completion with short timeout
-            validation_result = await asyncio.wait_for(asyncio.shield(validation_task), timeout=heartbeat_interval)
+            await asyncio.wait_for(asyncio.shield(validation_task), timeout=heartbeat_interval)
             break
         except asyncio.TimeoutError:
             # Task still running, send heartbeat update
             # Since we timed out after heartbeat_interval seconds, we should send a heartbeat
-            current_time = time.time()
+            current_time = time.perf_counter()
             try:
                 # Update session to show validation is still in progress
                 # This triggers SSE stream to send updates to clients
@@ -242,15 +469,21 @@ async def validate_code_node(state: WorkflowState) -> dict:
                     session.updated_at = datetime.utcnow()
                     from services.session_manager import session_manager
                     session_manager.update_session(session)
-                    logger_validate.debug(f"Sent validation heartbeat ({current_time - start_time:.1f}s elapsed)")
+                    logger_validate.debug("Sent validation heartbeat ({:.1f}s elapsed)", current_time - start_time)
                 last_heartbeat = current_time
             except Exception as e:
                 logger_validate.warning(f"Failed to send validation heartbeat: {e}")
             continue
 
-    # Get result from completed task
-    validation_result = await validation_task
-    end_time = time.time()
+    # Get result from completed task (code is the winning candidate)
+    code, validation_result = await validation_task
+    end_time = time.perf_counter()
+
+    # Valid code means the speculative refinement is not needed
+    if validation_result["is_valid"]:
+        _discard_speculative(state["session_id"])
+        # Only validated code enters the cross-session cache (no poisoning)
+        llm_cache.put(state["model"], state["prompt"], state["temperature"], code, validation_result)
 
     # Create validation metrics
     validation_metrics = ValidationMetrics(
@@ -268,17 +501,16 @@ async def validate_code_node(state: WorkflowState) -> dict:
         validation_metrics=validation_metrics
     )
 
-    # Add to history
-    iterations_history = state["iterations_history"].copy()
-    iterations_history.append(iteration)
-
-    logger_validate.info(f"Validation result: {validation_result['is_valid']} (took {validation_metrics.time_taken:.2f}s)")
+    logger_validate.info("Validation result: {} (took {:.2f}s)", validation_result["is_valid"], validation_metrics.time_taken)
     if not validation_result["is_valid"]:
-        logger_validate.warning(f"Errors: {validation_result['errors']}")
+        logger_validate.warning("Errors: {}", validation_result["errors"])
 
+    # The reducer on iterations_history appends this to the existing list.
+    # generated_code is re-emitted so the winning candidate propagates.
     return {
+        "generated_code": code,
         "validation_result": validation_result,
-        "iterations_history": iterations_history,
+        "iterations_history": [iteration],
         "current_iteration": state["current_iteration"] + 1,
         "validation_metrics": validation_metrics
     }
@@ -296,7 +528,7 @@ def decide_next_step(state: WorkflowState) -> str:
     current_iter = state["current_iteration"]
     max_iter = state["max_iterations"]
 
-    logger_decide.info(f"Iteration {current_iter}/{max_iter}, Valid: {validation['is_valid']}")
+    logger_decide.info("Iteration {}/{}, Valid: {}", current_iter, max_iter, validation["is_valid"])
 
     if validation["is_valid"]:
         logger_decide.success("Code is valid! Going to complete.")
@@ -331,36 +563,28 @@ async def max_iterations_node(state: WorkflowState) -> dict:
     }
 
 
-async def refine_node(state: WorkflowState) -> dict:
-    """
-    Node that prepares for refinement by updating status.
-    The actual refinement happens in the next generate_code_node call.
-    """
-    logger_refine.info("Preparing for refinement...")
-    return {
-        "status": IterationStatus.REFINING
-    }
-
-
 def create_workflow() -> StateGraph:
     """
     Create the LangGraph workflow for iterative code generation.
 
     Workflow structure:
     START -> generate -> validate -> decide
-                            ^          |
-                            |          v
-                         refine <- [has errors?]
+                ^                      |
+                |                      v
+                +------- [has errors?]
                                       |
                                       v
                                   complete or max_iterations -> END
+
+    The refine hop routes straight back to generate: generate_code_node
+    sets the REFINING status itself, so a dedicated pass-through node would
+    only add a scheduling hop and an extra streamed event per iteration.
     """
     workflow = StateGraph(WorkflowState)
 
     # Add nodes
     workflow.add_node("generate", generate_code_node)
     workflow.add_node("validate", validate_code_node)
-    workflow.add_node("refine", refine_node)
     workflow.add_node("complete", complete_node)
     workflow.add_node("max_iterations", max_iterations_node)
 
@@ -368,20 +592,17 @@ def create_workflow() -> StateGraph:
     workflow.set_entry_point("generate")
     workflow.add_edge("generate", "validate")
 
-    # Conditional edges from decide
+    # Conditional edges from decide - refine loops straight back to generate
     workflow.add_conditional_edges(
         "validate",
         decide_next_step,
         {
             "complete": "complete",
-            "refine": "refine",
+            "refine": "generate",
             "max_iterations": "max_iterations"
         }
     )
 
-    # Refine loops back to generate
-    workflow.add_edge("refine", "generate")
-
     # Terminal nodes
     workflow.add_edge("complete", END)
     workflow.add_edge("max_iterations", END)
@@ -389,6 +610,18 @@ def create_workflow() -> StateGraph:
     return workflow.compile()
 
 
+@lru_cache(maxsize=1)
+def _compiled_workflow():
+    """
+    Return the compiled workflow, building it on first use.
+
+    The graph is stateless (all per-run data lives in WorkflowState), so one
+    compiled instance can be shared by every request instead of rebuilding
+    and recompiling the graph on each call.
+    """
+    return create_workflow()
+
+
 async def run_iterative_generation(
     session_id: str,
     prompt: str,
@@ -396,6 +629,7 @@ async def run_iterative_generation(
     temperature: float,
     max_tokens: int,
     max_iterations: int = 5,
+    candidates_per_iteration: int = 1,
     progress_callback: Optional[Callable[[dict], None]] = None
 ) -> WorkflowState:
     """
@@ -408,13 +642,14 @@ async def run_iterative_generation(
         temperature: Generation temperature
         max_tokens: Maximum tokens for generation
         max_iterations: Maximum refinement iterations
+        candidates_per_iteration: Parallel candidates generated per iteration (best-of-N)
         progress_callback: Optional callback for progress updates
 
     Returns:
         Final workflow state with results
     """
-    logger_workflow.info(f"Starting iterative generation for session {session_id}")
-    logger_workflow.info(f"Model: {model}, Max iterations: {max_iterations}")
+    logger_workflow.info("Starting iterative generation for session {}", session_id)
+    logger_workflow.info("Model: {}, Max iterations: {}", model, max_iterations)
 
     # Initialize state
     initial_state: WorkflowState = {
@@ -425,8 +660,10 @@ async def run_iterative_generation(
         "max_tokens": max_tokens,
         "max_iterations": max_iterations,
         "current_iteration": 0,
+        "candidates_per_iteration": candidates_per_iteration,
         "messages": [],
         "generated_code": None,
+        "candidate_codes": None,
         "validation_result": None,
         "iterations_history": [],
         "status": IterationStatus.GENERATING,
@@ -435,49 +672,153 @@ async def run_iterative_generation(
         "validation_metrics": None
     }
 
-    # Create and run workflow
-    workflow = create_workflow()
+    # Short-circuit on a repeat of a recently successful prompt
+    cache_key = _result_cache_key(model, temperature, prompt)
+    cached_code = _result_cache_get(cache_key)
+    if cached_code is not None:
+        logger_workflow.info("Result cache hit - reusing previous successful code")
+        final_state = _cached_final_state(initial_state, cached_code)
+        if progress_callback:
+            await progress_callback({
+                "session_id": session_id,
+                "node": "complete",
+                "status": IterationStatus.SUCCESS,
+                "current_iteration": 1,
+                "max_iterations": max_iterations,
+                "generated_code": cached_code,
+                "validation_result": final_state["validation_result"],
+                "iterations_history": final_state["iterations_history"],
+                "error_message": None
+            })
+        return final_state
+
+    # Get the shared compiled workflow
+    workflow = _compiled_workflow()
+
+    # Execute workflow with streaming if callback provided. Any speculative
+    # refinement still stashed when the workflow exits (error, cancellation,
+    # abort between validate and the next generate) is discarded in the
+    # finally so _SPECULATIVE_REFINEMENTS cannot accumulate dead entries.
+    try:
+        if progress_callback:
+            # Stream events from workflow and accumulate final state.
+            # Seed from the initial state so the workflow is never re-invoked
+            # (a second ainvoke would re-run every LLM call and validation).
+            final_state = dict(initial_state)
+            async for event in workflow.astream(initial_state):
+                # Extract node name and state from event
+                if event:
+                    for node_name, node_state in event.items():
+                        # Nodes return only newly appended iteration records
+                        # (reducer semantics) - accumulate them here
+                        new_iterations = node_state.get("iterations_history")
+                        if new_iterations:
+                            final_state["iterations_history"] = (
+                                final_state["iterations_history"] + new_iterations
+                            )
+
+                        # Send progress update
+                        progress_data = {
+                            "session_id": session_id,
+                            "node": node_name,
+                            "status": node_state.get("status", IterationStatus.GENERATING),
+                            "current_iteration": node_state.get("current_iteration", 0),
+                            "max_iterations": max_iterations,
+                            # Full code only on generate events; other nodes would
+                            # just repeat it (it is in iterations_history anyway)
+                            "generated_code": node_state.get("generated_code") if node_name == "generate" else None,
+                            "validation_result": node_state.get("validation_result"),
+                            "iterations_history": final_state["iterations_history"],
+                            "error_message": node_state.get("error_message")
+                        }
+                        await progress_callback(progress_data)
+
+                        # Merge in place, preserving the most recent non-None
+                        # values (avoids two throwaway dicts per event)
+                        for k, v in node_state.items():
+                            if v is not None and k != "iterations_history":
+                                final_state[k] = v
+        else:
+            # Execute workflow normally without streaming
+            final_state = await workflow.ainvoke(initial_state)
+    finally:
+        _discard_speculative(session_id)
 
-    # Execute workflow with streaming if callback provided
-    if progress_callback:
-        # Stream events from workflow and accumulate final state
-        final_state = None
-        async for event in workflow.astream(initial_state):
-            # Extract node name and state from event
-            if event:
-                for node_name, node_state in event.items():
-                    # Send progress update
-                    progress_data = {
-                        "session_id": session_id,
-                        "node": node_name,
-                        "status": node_state.get("status", IterationStatus.GENERATING),
-                        "current_iteration": node_state.get("current_iteration", 0),
-                        "max_iterations": max_iterations,
-                        "generated_code": node_state.get("generated_code"),
-                        "validation_result": node_state.get("validation_result"),
-                        "iterations_history": node_state.get("iterations_history", []),
-                        "error_message": node_state.get("error_message")
-                    }
-                    await progress_callback(progress_data)
+    if final_state["status"] == IterationStatus.SUCCESS and final_state.get("generated_code"):
+        _result_cache_put(cache_key, final_state["generated_code"])
 
-                    # Accumulate the most complete state
-                    if final_state is None:
-                        final_state = node_state
-                    else:
-                        # Merge states, preserving the most recent non-None values
-                        final_state = {**final_state, **{k: v for k, v in node_state.items() if v is not None}}
+    logger_workflow.success("Completed with status: {}", final_state["status"])
+    logger_workflow.info("Total iterations: {}", final_state["current_iteration"])
 
-        # If no events were received, fall back to invoke
-        if final_state is None:
-            final_state = await workflow.ainvoke(initial_state)
-    else:
-        # Execute workflow normally without streaming
-        final_state = await workflow.ainvoke(initial_state)
+    return final_state
 
-    logger_workflow.success(f"Completed with status: {final_state['status']}")
-    logger_workflow.info(f"Total iterations: {final_state['current_iteration']}")
 
-    return final_state
+# Last successful code per (model, temperature, prompt hash). Repeat prompts
+# are common during UI experimentation/retries; a hit skips the whole
+# generate->validate loop with zero LLM calls. Only SUCCESS results are stored.
+_RESULT_CACHE: OrderedDict[tuple, str] = OrderedDict()
+_RESULT_CACHE_MAX = 128
+
+
+def _result_cache_key(model: str, temperature: float, prompt: str) -> tuple:
+    """Build the result-cache key for a generation request."""
+    return (model, round(temperature, 2), hashlib.sha256(prompt.encode()).hexdigest())
+
+
+def _result_cache_get(key: tuple) -> str | None:
+    """Return the cached successful code for key, refreshing its LRU slot."""
+    code = _RESULT_CACHE.get(key)
+    if code is not None:
+        _RESULT_CACHE.move_to_end(key)
+    return code
+
+
+def _result_cache_put(key: tuple, code: str) -> None:
+    """Store a successful result, evicting the oldest entry past the cap."""
+    _RESULT_CACHE[key] = code
+    _RESULT_CACHE.move_to_end(key)
+    if len(_RESULT_CACHE) > _RESULT_CACHE_MAX:
+        _RESULT_CACHE.popitem(last=False)
+
+
+def _cached_final_state(initial_state: WorkflowState, code: str) -> WorkflowState:
+    """Build a synthetic single-iteration SUCCESS state for a cache hit."""
+    iteration = CodeIteration(
+        iteration_number=1,
+        generated_code=code,
+        validation_result={"is_valid": True, "errors": [], "warnings": []},
+        timestamp=datetime.utcnow(),
+        status=IterationStatus.SUCCESS
+    )
+    return {
+        **initial_state,
+        "current_iteration": 1,
+        "generated_code": code,
+        "validation_result": iteration.validation_result,
+        "iterations_history": [iteration],
+        "status": IterationStatus.SUCCESS
+    }
+
+
+def _serialize_iteration(iteration: CodeIteration) -> dict:
+    """Serialize a CodeIteration into the dict shape used by streaming events."""
+    return {
+        "iteration_number": iteration.iteration_number,
+        "generated_code": iteration.generated_code,
+        "validation_result": iteration.validation_result,
+        "timestamp": iteration.timestamp.isoformat(),
+        "status": iteration.status,
+        "generation_metrics": {
+            "time_taken": iteration.generation_metrics.time_taken,
+            "prompt_tokens": iteration.generation_metrics.prompt_tokens,
+            "completion_tokens": iteration.generation_metrics.completion_tokens,
+            "total_tokens": iteration.generation_metrics.total_tokens,
+            "model": iteration.generation_metrics.model
+        } if iteration.generation_metrics else None,
+        "validation_metrics": {
+            "time_taken": iteration.validation_metrics.time_taken
+        } if iteration.validation_metrics else None
+    }
 
 
 async def run_iterative_generation_streaming(
@@ -486,7 +827,8 @@ async def run_iterative_generation_streaming(
     model: str,
     temperature: float,
     max_tokens: int,
-    max_iterations: int = 5
+    max_iterations: int = 5,
+    candidates_per_iteration: int = 1
 ):
     """
     Run the iterative code generation workflow with streaming.
@@ -499,12 +841,13 @@ async def run_iterative_generation_streaming(
         temperature: Generation temperature
         max_tokens: Maximum tokens for generation
         max_iterations: Maximum refinement iterations
+        candidates_per_iteration: Parallel candidates generated per iteration (best-of-N)
 
     Yields:
         Progress updates as dictionaries
     """
-    logger_workflow.info(f"[Streaming] Starting iterative generation for session {session_id}")
-    logger_workflow.info(f"[Streaming] Model: {model}, Max iterations: {max_iterations}")
+    logger_workflow.info("[Streaming] Starting iterative generation for session {}", session_id)
+    logger_workflow.info("[Streaming] Model: {}, Max iterations: {}", model, max_iterations)
 
     # Initialize state
     initial_state: WorkflowState = {
@@ -515,8 +858,10 @@ async def run_iterative_generation_streaming(
         "max_tokens": max_tokens,
         "max_iterations": max_iterations,
         "current_iteration": 0,
+        "candidates_per_iteration": candidates_per_iteration,
         "messages": [],
         "generated_code": None,
+        "candidate_codes": None,
         "validation_result": None,
         "iterations_history": [],
         "status": IterationStatus.GENERATING,
@@ -525,8 +870,8 @@ async def run_iterative_generation_streaming(
         "validation_metrics": None
     }
 
-    # Create workflow
-    workflow = create_workflow()
+    # Get the shared compiled workflow
+    workflow = _compiled_workflow()
 
     # Yield initial status
     yield {
@@ -538,56 +883,80 @@ async def run_iterative_generation_streaming(
         "message": "Starting code generation workflow..."
     }
 
-    # Stream workflow execution
-    final_state = None
-    async for event in workflow.astream(initial_state):
-        if event:
-            for node_name, node_state in event.items():
-                # Extract iteration info if available
-                iterations_history = node_state.get("iterations_history", [])
-                current_iteration = node_state.get("current_iteration", 0)
-
-                # Send progress update with full iteration details
-                progress_data = {
-                    "session_id": session_id,
-                    "event": "progress",
-                    "node": node_name,
-                    "status": node_state.get("status", IterationStatus.GENERATING),
-                    "current_iteration": current_iteration,
-                    "max_iterations": max_iterations,
-                    "generated_code": node_state.get("generated_code"),
-                    "validation_result": node_state.get("validation_result"),
-                    "iterations_history": [
-                        {
-                            "iteration_number": iter.iteration_number,
-                            "generated_code": iter.generated_code,
-                            "validation_result": iter.validation_result,
-                            "timestamp": iter.timestamp.isoformat(),
-                            "status": iter.status,
-                            "generation_metrics": {
-                                "time_taken": iter.generation_metrics.time_taken,
-                                "prompt_tokens": iter.generation_metrics.prompt_tokens,
-                                "completion_tokens": iter.generation_metrics.completion_tokens,
-                                "total_tokens": iter.generation_metrics.total_tokens,
-                                "model": iter.generation_metrics.model
-                            } if iter.generation_metrics else None,
-                            "validation_metrics": {
-                                "time_taken": iter.validation_metrics.time_taken
-                            } if iter.validation_metrics else None
-                        }
-                        for iter in iterations_history
-                    ],
-                    "error_message": node_state.get("error_message"),
-                    "message": f"Node '{node_name}' completed for iteration {current_iteration}"
-                }
-                yield progress_data
-
-                # Keep track of the most complete state (preserve data from validate node)
-                if final_state is None:
-                    final_state = node_state
-                else:
-                    # Merge states, preserving non-None values
-                    final_state = {**final_state, **{k: v for k, v in node_state.items() if v is not None}}
+    # Short-circuit on a repeat of a recently successful prompt
+    cache_key = _result_cache_key(model, temperature, prompt)
+    cached_code = _result_cache_get(cache_key)
+    if cached_code is not None:
+        logger_workflow.info("[Streaming] Result cache hit - reusing previous successful code")
+        final_state = _cached_final_state(initial_state, cached_code)
+        yield {
+            "session_id": session_id,
+            "event": "complete",
+            "status": IterationStatus.SUCCESS,
+            "current_iteration": 1,
+            "max_iterations": max_iterations,
+            "generated_code": cached_code,
+            "validation_result": final_state["validation_result"],
+            "iterations_history": [
+                _serialize_iteration(iter)
+                for iter in final_state["iterations_history"]
+            ],
+            "message": "Workflow completed successfully!"
+        }
+        return
+
+    # Stream workflow execution. Serialized history is built incrementally:
+    # each new iteration is serialized exactly once when it appears instead
+    # of re-serializing the whole history for every event. The finally also
+    # covers a consumer closing this generator mid-stream, so a stashed
+    # speculative refinement never outlives the workflow.
+    final_state = dict(initial_state)
+    serialized_history: list[dict] = []
+    try:
+        async for event in workflow.astream(initial_state):
+            if event:
+                for node_name, node_state in event.items():
+                    # Nodes return only newly appended iteration records
+                    # (reducer semantics) - accumulate them here
+                    new_iterations = node_state.get("iterations_history")
+                    if new_iterations:
+                        final_state["iterations_history"] = (
+                            final_state["iterations_history"] + new_iterations
+                        )
+                        serialized_history.extend(
+                            _serialize_iteration(iter) for iter in new_iterations
+                        )
+
+                    current_iteration = node_state.get("current_iteration", 0)
+
+                    # Send progress update with full iteration details
+                    progress_data = {
+                        "session_id": session_id,
+                        "event": "progress",
+                        "node": node_name,
+                        "status": node_state.get("status", IterationStatus.GENERATING),
+                        "current_iteration": current_iteration,
+                        "max_iterations": max_iterations,
+                        # Full code only on generate events; other nodes would
+                        # just repeat it (the complete event carries the history)
+                        "generated_code": node_state.get("generated_code") if node_name == "generate" else None,
+                        "validation_result": node_state.get("validation_result"),
+                        # Progress events carry only the delta; the full history
+                        # is sent once, on the final complete event
+                        "new_iteration": serialized_history[-1] if new_iterations else None,
+                        "iteration_count": len(serialized_history),
+                        "error_message": node_state.get("error_message"),
+                        "message": f"Node '{node_name}' completed for iteration {current_iteration}"
+                    }
+                    yield progress_data
+
+                    # Keep track of the most complete state (preserve data from
+                    # validate node), merging in place to avoid allocator churn
+                    for k, v in node_state.items():
+                        if v is not None and k != "iterations_history":
+                            final_state[k] = v
+    finally:
+        _discard_speculative(session_id)
 
     # Yield final completion event
     if final_state:
@@ -599,28 +968,52 @@ async def run_iterative_generation_streaming(
             "max_iterations": max_iterations,
             "generated_code": final_state.get("generated_code"),
             "validation_result": final_state.get("validation_result"),
-            "iterations_history": [
-                {
-                    "iteration_number": iter.iteration_number,
-                    "generated_code": iter.generated_code,
-                    "validation_result": iter.validation_result,
-                    "timestamp": iter.timestamp.isoformat(),
-                    "status": iter.status,
-                    "generation_metrics": {
-                        "time_taken": iter.generation_metrics.time_taken,
-                        "prompt_tokens": iter.generation_metrics.prompt_tokens,
-                        "completion_tokens": iter.generation_metrics.completion_tokens,
-                        "total_tokens": iter.generation_metrics.total_tokens,
-                        "model": iter.generation_metrics.model
-                    } if iter.generation_metrics else None,
-                    "validation_metrics": {
-                        "time_taken": iter.validation_metrics.time_taken
-                    } if iter.validation_metrics else None
-                }
-                for iter in final_state.get("iterations_history", [])
-            ],
+            "iterations_history": list(serialized_history),
             "message": "Workflow completed successfully!"
         }
 
-    logger_workflow.success(f"[Streaming] Completed with status: {final_state.get('status') if final_state else 'unknown'}")
-    logger_workflow.info(f"[Streaming] Total iterations: {final_state.get('current_iteration', 0) if final_state else 0}")
+    if final_state.get("status") == IterationStatus.SUCCESS and final_state.get("generated_code"):
+        _result_cache_put(cache_key, final_state["generated_code"])
+
+    logger_workflow.success("[Streaming] Completed with status: {}", final_state.get("status") if final_state else "unknown")
+    logger_workflow.info("[Streaming] Total iterations: {}", final_state.get("current_iteration", 0) if final_state else 0)
+
+
+async def run_many(
+    prompts: list[str],
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    max_iterations: int = 5,
+    candidates_per_iteration: int = 1
+) -> list[WorkflowState]:
+    """
+    Run the iterative workflow for many prompts concurrently.
+
+    For bulk generation throughput beats per-prompt latency: all workflows
+    run in parallel and the app-wide LLM semaphore bounds how many provider
+    calls are actually in flight at once.
+
+    Args:
+        prompts: Prompts to generate animations for
+        model: LLM model to use
+        temperature: Generation temperature
+        max_tokens: Maximum tokens for generation
+        max_iterations: Maximum refinement iterations per prompt
+        candidates_per_iteration: Parallel candidates generated per iteration (best-of-N)
+
+    Returns:
+        Final workflow states, in the same order as prompts
+    """
+    return await asyncio.gather(*(
+        run_iterative_generation(
+            session_id=uuid4().hex,
+            prompt=prompt,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            max_iterations=max_iterations,
+            candidates_per_iteration=candidates_per_iteration
+        )
+        for prompt in prompts
+    ))
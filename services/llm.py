@@ -0,0 +1,110 @@
+"""
+Shared entry point for LLM completions.
+
+Every LiteLLM call in the service goes through llm_acompletion, which caps
+the number of in-flight provider requests with a single app-wide semaphore
+and retries transient provider failures with exponential backoff. Without
+a cap, a burst of concurrent sessions opens one connection per call (TLS
+handshake storms) and quickly trips provider rate limits; without retries,
+a single 429/503 aborts the whole workflow and re-bills every prior
+iteration when the user retries from scratch.
+"""
+import asyncio
+import os
+import random
+
+import litellm
+from litellm import acompletion
+
+from utils.logger import get_logger
+
+logger = get_logger("LLM")
+
+# Maximum concurrent provider calls across the whole app (override via env)
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "64"))
+
+_LLM_SEMAPHORE = asyncio.Semaphore(LLM_MAX_INFLIGHT)
+
+# Transient provider failures worth retrying. Other errors (auth, invalid
+# request, context length) are deterministic and re-raise immediately.
+_RETRYABLE_ERRORS = (
+    litellm.RateLimitError,
+    litellm.APIConnectionError,
+    litellm.Timeout,
+    litellm.ServiceUnavailableError,
+)
+
+_MAX_ATTEMPTS = 4
+_BACKOFF_BASE = 0.5  # seconds
+
+
+async def llm_acompletion(**kwargs):
+    """
+    Call litellm.acompletion with the app-wide concurrency cap applied.
+
+    Transient failures (rate limits, connection errors, timeouts, 503s) are
+    retried up to 4 times with exponential backoff and full jitter; the
+    semaphore is released while sleeping so other calls can proceed.
+    Accepts the same keyword arguments as litellm.acompletion and returns
+    its response unchanged. For non-streaming calls only: with stream=True
+    the returned wrapper is consumed after the semaphore is released, which
+    defeats the concurrency cap - use llm_stream_completion instead.
+    """
+    for attempt in range(_MAX_ATTEMPTS):
+        try:
+            async with _LLM_SEMAPHORE:
+                return await acompletion(**kwargs)
+        except _RETRYABLE_ERRORS as e:
+            if attempt + 1 >= _MAX_ATTEMPTS:
+                logger.error("LLM call failed after {} attempts: {}", _MAX_ATTEMPTS, e)
+                raise
+            delay = random.uniform(0, _BACKOFF_BASE * 2 ** attempt)
+            logger.warning(
+                "Transient LLM error ({}); retrying in {:.2f}s (attempt {}/{})",
+                type(e).__name__, delay, attempt + 1, _MAX_ATTEMPTS
+            )
+            await asyncio.sleep(delay)
+
+
+async def llm_stream_completion(**kwargs):
+    """
+    Run a streamed completion and accumulate it into (content, usage).
+
+    The semaphore is held across the whole stream drain, not just the
+    initiating call: an open stream occupies a provider connection for
+    its entire lifetime, so releasing the permit once the wrapper object
+    exists would let unbounded streams run concurrently. Draining inside
+    the retry loop also means a transient failure mid-stream is retried
+    from the top instead of surfacing to the caller.
+
+    Usage is reported on the final chunk via stream_options.
+    """
+    for attempt in range(_MAX_ATTEMPTS):
+        try:
+            async with _LLM_SEMAPHORE:
+                stream = await acompletion(
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **kwargs
+                )
+                parts = []
+                usage = None
+                async for chunk in stream:
+                    if chunk.choices:
+                        delta = chunk.choices[0].delta.content or ""
+                        if delta:
+                            parts.append(delta)
+                    chunk_usage = getattr(chunk, "usage", None)
+                    if chunk_usage:
+                        usage = chunk_usage
+                return "".join(parts), usage
+        except _RETRYABLE_ERRORS as e:
+            if attempt + 1 >= _MAX_ATTEMPTS:
+                logger.error("LLM stream failed after {} attempts: {}", _MAX_ATTEMPTS, e)
+                raise
+            delay = random.uniform(0, _BACKOFF_BASE * 2 ** attempt)
+            logger.warning(
+                "Transient LLM stream error ({}); retrying in {:.2f}s (attempt {}/{})",
+                type(e).__name__, delay, attempt + 1, _MAX_ATTEMPTS
+            )
+            await asyncio.sleep(delay)
@@ -0,0 +1,82 @@
+"""
+Cross-session cache for validated LLM generation results.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Optional
+
+from utils.logger import get_logger
+
+logger = get_logger("LLMCache")
+
+
+class LLMCache:
+    """
+    In-memory LRU cache for validated LLM generations.
+
+    Keys are the SHA-256 of the canonical JSON of (model, prompt,
+    temperature), so only exact repeats hit. Entries store the generated
+    code together with its validation result, which lets a hit skip both
+    the completion round-trip and the Manim dry-run validation.
+
+    Entries are only added for code that passed validation, so the cache
+    can never serve known-broken output.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(model: str, prompt: str, temperature: float) -> str:
+        """Build the exact-match cache key for a generation request."""
+        canonical = json.dumps(
+            {"model": model, "prompt": prompt, "temperature": round(temperature, 2)},
+            sort_keys=True
+        )
+        # blake2b is faster than sha256 for short inputs and 16 bytes is
+        # plenty of collision resistance for a cache key
+        return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+    def get(self, model: str, prompt: str, temperature: float) -> Optional[dict]:
+        """Return the cached entry for this request, or None on a miss."""
+        key = self.cache_key(model, prompt, temperature)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        logger.debug("Cache hit ({} hits / {} misses)", self.hits, self.misses)
+        return entry
+
+    def put(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        generated_code: str,
+        validation_result: dict
+    ) -> None:
+        """Store a validated generation, evicting the oldest entry past the cap."""
+        key = self.cache_key(model, prompt, temperature)
+        self._entries[key] = {
+            "generated_code": generated_code,
+            "validation_result": validation_result
+        }
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached entries and reset the hit/miss counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Global cache instance shared by all workflows in this process
+llm_cache = LLMCache()
@@ -2,7 +2,8 @@
 Session management service for storing and retrieving iterative generation sessions.
 """
 from typing import Dict, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+import os
 import uuid
 
 from models.session import SessionState, IterationStatus
@@ -74,8 +75,19 @@ class SessionManager:
             session: Updated SessionState
         """
         session.updated_at = datetime.utcnow()
+        session.version += 1
         self._sessions[session.session_id] = session
 
+    def get_version(self, session_id: str) -> int:
+        """
+        Return the session's current version, or -1 if it does not exist.
+
+        Cheap staleness probe: callers holding a cached SessionState can
+        compare versions instead of re-fetching the whole session.
+        """
+        session = self._sessions.get(session_id)
+        return session.version if session else -1
+
     def delete_session(self, session_id: str) -> bool:
         """
         Delete a session.
@@ -86,10 +98,7 @@ class SessionManager:
         Returns:
             True if deleted, False if not found
         """
-        if session_id in self._sessions:
-            del self._sessions[session_id]
-            return True
-        return False
+        return self._sessions.pop(session_id, None) is not None
 
     def list_sessions(self) -> list[SessionState]:
         """
@@ -110,19 +119,180 @@ class SessionManager:
         Returns:
             Number of sessions deleted
         """
-        from datetime import timedelta
-
         cutoff_time = datetime.utcnow() - timedelta(hours=max_age_hours)
-        to_delete = [
-            sid for sid, session in self._sessions.items()
-            if session.updated_at < cutoff_time
-        ]
+        old_count = len(self._sessions)
+        self._sessions = {
+            sid: session for sid, session in self._sessions.items()
+            if session.updated_at >= cutoff_time
+        }
+        return old_count - len(self._sessions)
+
+
+class RedisSessionManager:
+    """
+    Redis-backed session storage with native TTL expiry.
+
+    Implements the same synchronous API as SessionManager, but sessions are
+    serialized as JSON under `session:{id}` keys, so they survive process
+    restarts, are shared across Uvicorn workers, and expire inside Redis
+    instead of requiring a Python-side cleanup scan. Every update refreshes
+    the TTL, mirroring the in-memory manager's updated_at-based cleanup.
+    """
+
+    def __init__(self, url: Optional[str] = None, max_age_hours: int = 24):
+        # Imported lazily so the default in-memory backend works without redis
+        import redis
+
+        self._redis = redis.Redis.from_url(
+            url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        )
+        self._ttl_seconds = max_age_hours * 3600
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"session:{session_id}"
+
+    @staticmethod
+    def _version_key(session_id: str) -> str:
+        # Version lives in its own tiny key so staleness probes (one per
+        # SSE tick per connection) are a single small GET instead of
+        # fetching and deserializing the whole session JSON
+        return f"session:{session_id}:v"
+
+    def create_session(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        max_iterations: int = 5
+    ) -> SessionState:
+        """
+        Create a new session.
+
+        Args:
+            prompt: User's prompt
+            model: LLM model to use
+            temperature: Generation temperature
+            max_tokens: Maximum tokens
+            max_iterations: Maximum refinement iterations
+
+        Returns:
+            New SessionState
+        """
+        session_id = str(uuid.uuid4())
+
+        session = SessionState(
+            session_id=session_id,
+            prompt=prompt,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            max_iterations=max_iterations,
+            current_iteration=0,
+            status=IterationStatus.GENERATING
+        )
+
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.set(self._key(session_id), session.model_dump_json(), ex=self._ttl_seconds)
+        pipe.set(self._version_key(session_id), session.version, ex=self._ttl_seconds)
+        pipe.execute()
+        return session
+
+    def get_session(self, session_id: str) -> Optional[SessionState]:
+        """
+        Retrieve a session by ID.
+
+        Args:
+            session_id: Session ID
+
+        Returns:
+            SessionState if found, None otherwise
+        """
+        data = self._redis.get(self._key(session_id))
+        if data is None:
+            return None
+        return SessionState.model_validate_json(data)
+
+    def update_session(self, session: SessionState) -> None:
+        """
+        Update an existing session, refreshing its TTL.
+
+        Args:
+            session: Updated SessionState
+        """
+        session.updated_at = datetime.utcnow()
+        session.version += 1
+        # Both keys in one pipelined round trip; the version mirror is SET
+        # (not INCRed) so it can never drift from the serialized session
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.set(self._key(session.session_id), session.model_dump_json(), ex=self._ttl_seconds)
+        pipe.set(self._version_key(session.session_id), session.version, ex=self._ttl_seconds)
+        pipe.execute()
+
+    def get_version(self, session_id: str) -> int:
+        """
+        Return the session's current version, or -1 if it does not exist.
+
+        Reads the dedicated version key, so the probe costs one small GET
+        rather than fetching and deserializing the session JSON. Note the
+        redis client is synchronous: SSE pollers calling this from the
+        event loop still pay one blocking round trip per tick, just a far
+        smaller one.
+        """
+        value = self._redis.get(self._version_key(session_id))
+        if value is not None:
+            return int(value)
+        # Version key missing (e.g. session written before it existed):
+        # fall back to the full fetch
+        session = self.get_session(session_id)
+        return session.version if session else -1
+
+    def delete_session(self, session_id: str) -> bool:
+        """
+        Delete a session.
+
+        Args:
+            session_id: Session ID
+
+        Returns:
+            True if deleted, False if not found
+        """
+        return self._redis.delete(self._key(session_id), self._version_key(session_id)) > 0
+
+    def list_sessions(self) -> list[SessionState]:
+        """
+        List all sessions (SCAN-based, never KEYS).
+
+        Returns:
+            List of all SessionStates
+        """
+        sessions = []
+        for key in self._redis.scan_iter(match="session:*"):
+            # Skip the version mirror keys; they hold bare integers
+            if key.endswith(b":v"):
+                continue
+            data = self._redis.get(key)
+            if data is not None:
+                sessions.append(SessionState.model_validate_json(data))
+        return sessions
+
+    def cleanup_old_sessions(self, max_age_hours: int = 24) -> int:
+        """
+        No-op: Redis expires sessions natively via per-key TTL.
+
+        Returns:
+            0 (expiration is handled by Redis)
+        """
+        return 0
 
-        for sid in to_delete:
-            del self._sessions[sid]
 
-        return len(to_delete)
+def _create_session_manager():
+    """Build the session manager selected by the SESSION_BACKEND env var."""
+    if os.getenv("SESSION_BACKEND", "memory").lower() == "redis":
+        return RedisSessionManager()
+    return SessionManager()
 
 
 # Global session manager instance
-session_manager = SessionManager()
+session_manager = _create_session_manager()
@@ -2,7 +2,10 @@
 Unified callable structure for session updates.
 Provides consistent update methods for both generation and render progress.
 """
+import asyncio
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, Dict, Any
 
 from models.session import (
@@ -18,6 +21,21 @@ from utils.logger import get_logger
 
 logger = get_logger("SessionUpdater")
 
+# Debounce window for coalesced session writes
+_FLUSH_DELAY = 0.05  # seconds
+
+
+@lru_cache(maxsize=4096)
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    """
+    Memoized datetime.isoformat.
+
+    get_current_state re-serializes every iteration and progress timestamp
+    on each SSE poll; the timestamps are immutable once recorded, so the
+    format cost is paid once per timestamp instead of once per poll.
+    """
+    return dt.isoformat() if dt else None
+
 
 class SessionUpdater:
     """
@@ -38,17 +56,90 @@ class SessionUpdater:
         if not self.session:
             raise ValueError(f"Session {session_id} not found")
 
+        self._dirty = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batch_depth = 0
+
+    # ==================== Session Cache ====================
+
+    def _refresh_if_stale(self) -> None:
+        """
+        Reload the cached session only if another writer bumped its version.
+
+        Single-writer flows (the generation loop, the render loop) never
+        miss, so the per-update get_session lookup disappears from the hot
+        path. Pending local mutations take precedence over a concurrent
+        bump and are never discarded by a reload.
+        """
+        if self._dirty:
+            return
+        version = session_manager.get_version(self.session_id)
+        if version == -1:
+            self.session = None
+            return
+        if self.session is None or version != self.session.version:
+            self.session = session_manager.get_session(self.session_id)
+
+    # ==================== Write Coalescing ====================
+
+    def _mark_dirty(self) -> None:
+        """
+        Record a pending mutation and schedule a debounced flush.
+
+        Bursty paths (the iteration loop, render progress ticks) call this
+        instead of writing through on every mutation; all writes within the
+        debounce window collapse into a single update_session call. Outside
+        a running event loop the write happens immediately.
+        """
+        self._dirty = True
+        if self._batch_depth > 0 or self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._flush()
+            return
+        self._flush_handle = loop.call_later(_FLUSH_DELAY, self._flush)
+
+    def _flush(self) -> None:
+        """Write buffered session state through to the session manager."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty or not self.session:
+            return
+        self._dirty = False
+        session_manager.update_session(self.session)
+
+    @contextmanager
+    def batch(self):
+        """
+        Coalesce every update inside the block into one persistence call.
+
+        Usage:
+            with updater.batch():
+                updater.update_render_progress(...)
+                updater.update_render_progress(...)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._flush()
+
     # ==================== Generation Updates ====================
 
     def update_generation_started(self) -> None:
         """Mark generation as started."""
-        self.session = session_manager.get_session(self.session_id)
+        self._refresh_if_stale()
         if not self.session:
             return
 
         self.session.status = IterationStatus.GENERATING
         self.session.current_iteration = 0
-        session_manager.update_session(self.session)
+        self._mark_dirty()
         logger.info(f"[{self.session_id}] Generation started")
 
     def update_generation_iteration(
@@ -71,7 +162,7 @@ class SessionUpdater:
             generation_metrics: Generation metrics (tokens, time, etc.)
             validation_metrics: Validation metrics (errors, warnings, etc.)
         """
-        self.session = session_manager.get_session(self.session_id)
+        self._refresh_if_stale()
         if not self.session:
             return
 
@@ -83,7 +174,7 @@ class SessionUpdater:
 
         # Add to iterations history
         if code or validation_result:
-            iteration_record = CodeIteration(
+            iteration_record = CodeIteration.model_construct(
                 iteration_number=iteration,
                 generated_code=code or "",
                 validation_result=validation_result,
@@ -93,19 +184,23 @@ class SessionUpdater:
                 validation_metrics=validation_metrics
             )
 
-            # Update or append iteration
-            existing_idx = next(
-                (i for i, it in enumerate(self.session.iterations)
-                 if it.iteration_number == iteration),
-                None
-            )
+            # Update or append iteration via the iteration_number index
+            index = self.session._iter_index
+            if len(index) != len(self.session.iterations):
+                # Rebuild lazily: the session may have been deserialized
+                # from storage, which drops private attributes
+                index.clear()
+                for i, it in enumerate(self.session.iterations):
+                    index[it.iteration_number] = i
 
+            existing_idx = index.get(iteration)
             if existing_idx is not None:
                 self.session.iterations[existing_idx] = iteration_record
             else:
                 self.session.iterations.append(iteration_record)
+                index[iteration] = len(self.session.iterations) - 1
 
-        session_manager.update_session(self.session)
+        self._mark_dirty()
         logger.info(f"[{self.session_id}] Iteration {iteration}: {status}")
 
     def update_generation_complete(
@@ -122,14 +217,15 @@ class SessionUpdater:
             status: Final status (SUCCESS or MAX_ITERATIONS_REACHED)
             message: Optional completion message
         """
-        self.session = session_manager.get_session(self.session_id)
+        self._refresh_if_stale()
         if not self.session:
             return
 
         self.session.status = status
         self.session.final_code = final_code if status == IterationStatus.SUCCESS else None
 
-        session_manager.update_session(self.session)
+        self._dirty = True
+        self._flush()
         logger.info(f"[{self.session_id}] Generation complete: {status}")
 
     def update_generation_error(self, error_message: str) -> None:
@@ -139,46 +235,54 @@ class SessionUpdater:
         Args:
             error_message: Error message
         """
-        self.session = session_manager.get_session(self.session_id)
+        self._refresh_if_stale()
         if not self.session:
             return
 
         self.session.status = IterationStatus.FAILED
         self.session.error_message = error_message
 
-        session_manager.update_session(self.session)
+        self._dirty = True
+        self._flush()
         logger.error(f"[{self.session_id}] Generation error: {error_message}")
 
     # ==================== Render Updates ====================
 
     def update_render_started(self) -> None:
         """Mark render as started."""
-        self.session = session_manager.get_session(self.session_id)
+        self._refresh_if_stale()
         if not self.session:
             return
 
+        now = datetime.utcnow()
         self.session.render_status = RenderStatus.PREPARING
-        self.session.render_started_at = datetime.utcnow()
-        self.session.render_progress = [RenderProgress(
+        self.session.render_started_at = now
+        self.session.render_progress = [RenderProgress.model_construct(
             status=RenderStatus.PREPARING,
             message="Starting video render",
-            timestamp=datetime.utcnow()
+            timestamp=now
         )]
         self.session.render_error = None
         self.session.render_completed_at = None
 
-        session_manager.update_session(self.session)
+        self._mark_dirty()
         logger.info(f"[{self.session_id}] Render started")
 
-    def update_render_progress(self, status: str, message: str) -> None:
+    def update_render_progress(self, status: str, message: str, coalesce: bool = True) -> None:
         """
         Update render progress.
 
+        Consecutive updates with the same status are coalesced into the
+        last progress entry (message/timestamp overwritten in place) so a
+        chatty render stage doesn't grow the list and every serialized
+        payload by one row per tick. Pass coalesce=False to keep every tick.
+
         Args:
             status: Render status string
             message: Progress message
+            coalesce: Overwrite the last entry when its status matches
         """
-        self.session = session_manager.get_session(self.session_id)
+        self._refresh_if_stale()
         if not self.session:
             return
 
@@ -189,14 +293,20 @@ class SessionUpdater:
             # If status doesn't match enum, default to rendering_video
             render_status = RenderStatus.RENDERING_VIDEO
 
+        now = datetime.utcnow()
         self.session.render_status = render_status
-        self.session.render_progress.append(RenderProgress(
-            status=render_status,
-            message=message,
-            timestamp=datetime.utcnow()
-        ))
-
-        session_manager.update_session(self.session)
+        progress = self.session.render_progress
+        if coalesce and progress and progress[-1].status == render_status:
+            progress[-1].message = message
+            progress[-1].timestamp = now
+        else:
+            progress.append(RenderProgress.model_construct(
+                status=render_status,
+                message=message,
+                timestamp=now
+            ))
+
+        self._mark_dirty()
         logger.info(f"[{self.session_id}] Render progress: {status} - {message}")
 
     def update_render_complete(self, video_path: str) -> None:
@@ -206,20 +316,22 @@ class SessionUpdater:
         Args:
             video_path: Path to rendered video
         """
-        self.session = session_manager.get_session(self.session_id)
+        self._refresh_if_stale()
         if not self.session:
             return
 
+        now = datetime.utcnow()
         self.session.rendered_video_path = video_path
         self.session.render_status = RenderStatus.COMPLETED
-        self.session.render_completed_at = datetime.utcnow()
-        self.session.render_progress.append(RenderProgress(
+        self.session.render_completed_at = now
+        self.session.render_progress.append(RenderProgress.model_construct(
             status=RenderStatus.COMPLETED,
             message="Video rendered successfully",
-            timestamp=datetime.utcnow()
+            timestamp=now
         ))
 
-        session_manager.update_session(self.session)
+        self._dirty = True
+        self._flush()
         logger.info(f"[{self.session_id}] Render complete: {video_path}")
 
     def update_render_error(self, error_message: str) -> None:
@@ -229,39 +341,60 @@ class SessionUpdater:
         Args:
             error_message: Error message
         """
-        self.session = session_manager.get_session(self.session_id)
+        self._refresh_if_stale()
         if not self.session:
             return
 
+        now = datetime.utcnow()
         self.session.render_status = RenderStatus.FAILED
         self.session.render_error = error_message
-        self.session.render_completed_at = datetime.utcnow()
-        self.session.render_progress.append(RenderProgress(
+        self.session.render_completed_at = now
+        self.session.render_progress.append(RenderProgress.model_construct(
             status=RenderStatus.FAILED,
             message=f"Render failed: {error_message}",
-            timestamp=datetime.utcnow(),
+            timestamp=now,
             error=error_message
         ))
 
-        session_manager.update_session(self.session)
+        self._dirty = True
+        self._flush()
         logger.error(f"[{self.session_id}] Render error: {error_message}")
 
     # ==================== Unified State ====================
 
-    def get_current_state(self) -> Dict[str, Any]:
+    def get_current_state(self, since: Optional[int] = None) -> Dict[str, Any]:
         """
         Get current session state for SSE/polling.
 
+        Args:
+            since: Version token from a previously returned state. When the
+                session has not changed, a minimal {"changed": False} marker
+                is returned instead of rebuilding the full payload. Changed
+                states always carry the full history lists: the frontend
+                replaces its copies wholesale, so the wire format must stay
+                complete.
+
         Returns:
-            Dict with complete session state
+            Dict with session state; includes "version" for use as the next
+            `since` token and "changed" so pollers can skip unchanged ticks.
         """
-        self.session = session_manager.get_session(self.session_id)
+        self._refresh_if_stale()
         if not self.session:
             return {"error": "Session not found"}
 
-        return {
+        version = self.session.version
+        if since is not None and since == version:
+            return {
+                "session_id": self.session_id,
+                "version": version,
+                "changed": False,
+            }
+
+        state = {
             "session_id": self.session.session_id,
-            "status": self.session.status,
+            "version": version,
+            "changed": True,
+            "status": self.session.status.value,
             "current_iteration": self.session.current_iteration,
             "max_iterations": self.session.max_iterations,
             "generated_code": self.session.generated_code,
@@ -269,25 +402,26 @@ class SessionUpdater:
             "iterations_history": [
                 {
                     "iteration_number": it.iteration_number,
-                    "status": it.status,
+                    "status": it.status.value,
                     "generated_code": it.generated_code,
                     "validation_result": it.validation_result,
-                    "timestamp": it.timestamp.isoformat() if it.timestamp else None,
+                    "timestamp": _iso(it.timestamp),
                 }
                 for it in self.session.iterations
             ],
-            "render_status": self.session.render_status,
+            "render_status": self.session.render_status.value if self.session.render_status else None,
             "render_progress": [
                 {
-                    "status": p.status,
+                    "status": p.status.value,
                     "message": p.message,
-                    "timestamp": p.timestamp.isoformat() if p.timestamp else None,
+                    "timestamp": _iso(p.timestamp),
                     "error": p.error
                 }
                 for p in self.session.render_progress
             ] if self.session.render_progress else [],
             "rendered_video_path": self.session.rendered_video_path,
             "render_error": self.session.render_error,
-            "created_at": self.session.created_at.isoformat() if self.session.created_at else None,
-            "updated_at": self.session.updated_at.isoformat() if self.session.updated_at else None,
+            "created_at": _iso(self.session.created_at),
+            "updated_at": _iso(self.session.updated_at),
         }
+        return state
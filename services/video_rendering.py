@@ -1,17 +1,127 @@
 import asyncio
+import contextlib
 import os
+import signal
+from collections import deque
 import shutil
 import sys
 import tempfile
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Callable
 
+from utils import render_cache
 from utils.constants import QUALITY_PRESETS
 from utils.logger import get_logger
 
 # Create logger
 logger = get_logger("VideoRendering")
 
+# Shared per-user cache for Manim's content-hashed intermediates. LaTeX
+# compiles (Tex -> dvi -> svg) dominate cold render time and are keyed by
+# content hash, so reuse across sessions is safe and hit rates are high.
+CACHE_ROOT = Path(os.environ.get("MANIM_GPT_CACHE", str(Path.home() / ".cache" / "manim-gpt")))
+
+_DOCKER_FONTS_CONF = """<?xml version="1.0"?>
+<!DOCTYPE fontconfig SYSTEM "fonts.dtd">
+<fontconfig>
+  <!-- System fonts from Debian packages -->
+  <dir>/usr/share/fonts</dir>
+  <dir>/usr/local/share/fonts</dir>
+  <cachedir>~/.cache/fontconfig</cachedir>
+  <!-- Rebuild cache automatically -->
+  <rescan>
+    <int>30</int>
+  </rescan>
+</fontconfig>
+"""
+
+_NIX_FONTS_CONF = """<?xml version="1.0"?>
+<!DOCTYPE fontconfig SYSTEM "fonts.dtd">
+<fontconfig>
+  <!-- DejaVu fonts from Nix store -->
+  <dir>/nix/store/1mjlla0fc468wl9cphnn2ivpfx02mr7j-dejavu-fonts-minimal-2.37/share/fonts</dir>
+  <cachedir>~/.cache/fontconfig</cachedir>
+</fontconfig>
+"""
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    """One-shot file write via raw os calls.
+
+    Skips TextIOWrapper construction, encode buffering, and flush for the
+    small per-render files (scene.py, manim.cfg) written on the hot path.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def _first_existing(paths):
+    """Return the first path that stats successfully, or None.
+
+    A bare os.stat in try/except is the cheapest existence probe: one
+    syscall per candidate with no Path allocation per probe.
+    """
+    for path in paths:
+        try:
+            os.stat(path)
+            return path
+        except OSError:
+            continue
+    return None
+
+
+# Manim quality-flag -> output directory name, fixed by Manim itself
+_QUALITY_DIRS = {
+    "l": "480p15",
+    "m": "720p30",
+    "h": "1080p60",
+    "p": "1440p60",
+    "k": "2160p60"
+}
+
+
+@lru_cache(maxsize=1)
+def _base_env() -> dict:
+    """
+    Snapshot of os.environ for render subprocesses, taken on first use.
+
+    Captured lazily rather than at import time so load_dotenv (which runs
+    after service imports) is reflected; afterwards the per-render
+    environment is a cheap dict splat instead of a full os.environ walk.
+    """
+    return dict(os.environ)
+
+
+@lru_cache(maxsize=1)
+def _get_fontconfig_path() -> str:
+    """
+    Write the fontconfig file once per process and reuse its path.
+
+    The content depends only on the runtime environment (Docker/Debian vs
+    Nix store), never on the individual render, so writing it per request
+    was pure syscall overhead. This fixes the "white boxes" issue where
+    text doesn't render.
+    """
+    # Detect environment: Nix store fonts vs Docker/standard Linux
+    nix_font_path = Path("/nix/store/1mjlla0fc468wl9cphnn2ivpfx02mr7j-dejavu-fonts-minimal-2.37/share/fonts")
+    is_docker = Path("/.dockerenv").exists() or not nix_font_path.exists()
+
+    if is_docker:
+        logger.info("Detected Docker/Debian environment - using system fonts")
+        content = _DOCKER_FONTS_CONF
+    else:
+        logger.info("Detected Nix environment - using Nix store fonts")
+        content = _NIX_FONTS_CONF
+
+    CACHE_ROOT.mkdir(parents=True, exist_ok=True)
+    fontconfig_path = CACHE_ROOT / "fonts.conf"
+    fontconfig_path.write_text(content)
+    return str(fontconfig_path)
+
 
 async def render_manim_video(
     code: str,
@@ -51,79 +161,118 @@ async def render_manim_video(
         timeout: Maximum time in seconds to wait for rendering (default: 600)
 
     Returns:
-        tuple: (video_path, temp_dir)
+        tuple: (video_path, temp_dir); the caller owns temp_dir and the
+        video inside it, whether freshly rendered or copied out of the
+        render cache
     """
     def emit_progress(status: str, message: str):
         """Helper to emit progress if callback is provided."""
         if progress_callback:
             progress_callback(status, message)
 
+    # Identical inputs recur as users iterate; serve the previous output
+    # instead of re-rendering. Subtitled renders are not cached here —
+    # their artifacts depend on more inputs and have their own cache.
+    render_key = None
+    if not include_subtitles:
+        render_key = render_cache.cache_key(code, output_format, quality, background_color)
+        cached_video = render_cache.get(render_key, output_format)
+        if cached_video:
+            logger.info(f"Render cache hit ({render_key}); skipping manim")
+            emit_progress("rendering_video", "Reusing previously rendered video")
+            # Copy the hit out of the cache directory: eviction may unlink
+            # the entry at any time, so the caller gets its own temp tree
+            # exactly as it would from a real render
+            temp_dir = tempfile.mkdtemp(prefix="manim_")
+            hit_path = os.path.join(temp_dir, f"output.{output_format}")
+            try:
+                await asyncio.to_thread(shutil.copy2, cached_video, hit_path)
+            except OSError as e:
+                # Entry evicted between get() and the copy - fall through
+                # to a normal render
+                logger.warning(f"Render cache entry vanished ({e}); re-rendering")
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            else:
+                return hit_path, temp_dir
+
     # Create temporary directory for the Manim project
     temp_dir = tempfile.mkdtemp(prefix="manim_")
     process = None
 
-    try:
-        emit_progress("preparing", "Setting up rendering environment")
+    async with contextlib.AsyncExitStack() as cleanup:
+        # Remove the temp tree on any failure (including cancellation).
+        # On success the stack is detached so the caller owns the directory.
+        # The walk/unlink storm over manim's intermediates runs in a worker
+        # thread so other sessions aren't stalled during cleanup.
+        async def _remove_temp_tree():
+            await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
 
-        # Detect environment and set up fontconfig accordingly
-        # Check if running in Nix environment or Docker/standard Linux
-        nix_font_path = Path("/nix/store/1mjlla0fc468wl9cphnn2ivpfx02mr7j-dejavu-fonts-minimal-2.37/share/fonts")
-        is_docker = Path("/.dockerenv").exists() or not nix_font_path.exists()
-
-        # Set up fontconfig to find fonts
-        # This fixes the "white boxes" issue where text doesn't render
-        fontconfig_dir = Path(temp_dir) / "fontconfig"
-        fontconfig_dir.mkdir()
-        fontconfig_path = fontconfig_dir / "fonts.conf"
-
-        if is_docker:
-            # Docker/Debian environment - use system font paths
-            logger.info("Detected Docker/Debian environment - using system fonts")
-            with open(fontconfig_path, "w") as f:
-                f.write("""<?xml version="1.0"?>
-<!DOCTYPE fontconfig SYSTEM "fonts.dtd">
-<fontconfig>
-  <!-- System fonts from Debian packages -->
-  <dir>/usr/share/fonts</dir>
-  <dir>/usr/local/share/fonts</dir>
-  <cachedir>~/.cache/fontconfig</cachedir>
-  <!-- Rebuild cache automatically -->
-  <rescan>
-    <int>30</int>
-  </rescan>
-</fontconfig>
-""")
-        else:
-            # Nix environment - use Nix store paths
-            logger.info("Detected Nix environment - using Nix store fonts")
-            with open(fontconfig_path, "w") as f:
-                f.write("""<?xml version="1.0"?>
-<!DOCTYPE fontconfig SYSTEM "fonts.dtd">
-<fontconfig>
-  <!-- DejaVu fonts from Nix store -->
-  <dir>/nix/store/1mjlla0fc468wl9cphnn2ivpfx02mr7j-dejavu-fonts-minimal-2.37/share/fonts</dir>
-  <cachedir>~/.cache/fontconfig</cachedir>
-</fontconfig>
-""")
+        cleanup.push_async_callback(_remove_temp_tree)
+
+        async def _terminate_subprocess():
+            """Ensure the render subprocess is not left running on failure."""
+            if process and process.returncode is None:
+                logger.info("Terminating rendering subprocess...")
+                try:
+                    # Signal the whole process group so manim's own children
+                    # (latex, ffmpeg) don't outlive it as orphans
+                    try:
+                        os.killpg(process.pid, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+                    try:
+                        # Wait briefly for graceful termination
+                        async with asyncio.timeout(5):
+                            await process.wait()
+                    except TimeoutError:
+                        # Force kill if it doesn't terminate gracefully
+                        logger.warning("Force killing rendering subprocess...")
+                        try:
+                            os.killpg(process.pid, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                        await process.wait()
+                except Exception as cleanup_error:
+                    logger.error(f"Error during subprocess cleanup: {cleanup_error}")
+
+        cleanup.push_async_callback(_terminate_subprocess)
+
+        emit_progress("preparing", "Setting up rendering environment")
 
-        # Create media directories that Manim expects
-        media_dir = Path(temp_dir) / "media"
-        media_dir.mkdir(exist_ok=True)
-        (media_dir / "Tex").mkdir(exist_ok=True)
-        (media_dir / "images").mkdir(exist_ok=True)
-        (media_dir / "text").mkdir(exist_ok=True)
-        (media_dir / "videos").mkdir(exist_ok=True)
+        # Fontconfig is environment-dependent, not render-dependent:
+        # written once per process into the shared cache
+        fontconfig_path = _get_fontconfig_path()
+
+        # Create media directories that Manim expects. Tex/text/images are
+        # symlinked into the shared cache so compiled fragments survive the
+        # per-session temp dir; videos stays local to the session.
+        media_dir = os.path.join(temp_dir, "media")
+        # The temp dir is freshly minted, so a plain mkdir suffices — no
+        # exist_ok stat-and-retry needed
+        os.mkdir(media_dir)
+        for shared_name in ("Tex", "text", "images"):
+            shared_target = CACHE_ROOT / shared_name
+            try:
+                shared_target.mkdir(parents=True, exist_ok=True)
+                os.symlink(shared_target, os.path.join(media_dir, shared_name),
+                           target_is_directory=True)
+            except OSError as e:
+                # Filesystem without symlinks (or unwritable cache): fall
+                # back to a plain per-session directory
+                logger.warning(f"Could not link shared {shared_name} cache: {e}")
+        # videos/ (and any unlinked subdir) is created on demand by
+        # Manim's FileWriter; no need to pre-create it here
 
         # Write the generated code to a Python file
-        script_path = Path(temp_dir) / "scene.py"
-        with open(script_path, "w") as f:
-            f.write(code)
+        script_path = os.path.join(temp_dir, "scene.py")
+        _write_bytes(script_path, code.encode())
 
         # Create manim config file if background color is specified
         if background_color:
-            config_path = Path(temp_dir) / "manim.cfg"
-            with open(config_path, "w") as f:
-                f.write(f"[CLI]\nbackground_color = {background_color}\n")
+            _write_bytes(
+                os.path.join(temp_dir, "manim.cfg"),
+                f"[CLI]\nbackground_color = {background_color}\n".encode()
+            )
 
         # Get quality settings
         quality_settings = QUALITY_PRESETS[quality]
@@ -132,7 +281,7 @@ async def render_manim_video(
         cmd = [
             sys.executable, "-m", "manim",
             "render",
-            str(script_path),
+            script_path,
             "GeneratedScene",
             "-q", quality_settings['quality_flag'],
             "-o", f"output.{output_format}",
@@ -140,49 +289,82 @@ async def render_manim_video(
         ]
 
         # Set up environment variables for font rendering
-        env = os.environ.copy()
-        env['FONTCONFIG_FILE'] = str(fontconfig_path)
+        env = {**_base_env(), 'FONTCONFIG_FILE': fontconfig_path}
+
+        # Warm the narration while manim renders: both depend only on
+        # code+prompt, so the LLM latency hides entirely behind the render
+        # subprocess. Skipped when the subtitle cache already has the
+        # artifacts, which would make the LLM call wasted spend.
+        narration_task = None
+        if include_subtitles and prompt:
+            from services.subtitle_generator import generate_narration_from_code
+            from utils import subtitle_cache
+
+            artifact_key = subtitle_cache.cache_key(
+                code, prompt, model, enable_audio,
+                audio_language, audio_speaker_id, audio_speed
+            )
+            if subtitle_cache.get(artifact_key, require_audio=enable_audio) is None:
+                logger.info("Pre-generating narration concurrently with render")
+                narration_task = asyncio.create_task(
+                    generate_narration_from_code(code, prompt, model=model)
+                )
+                cleanup.callback(narration_task.cancel)
 
         # Run manim rendering
         emit_progress("rendering_video", "Rendering Manim animation")
+        # Manim writes progress and errors to stderr; stdout carries nothing
+        # the server needs, so it is discarded at the OS level rather than
+        # pumped through a second reader coroutine
+        # close_fds=False keeps the spawn on CPython's posix_spawn fast path
+        # (no FD-close loop in the child); start_new_session puts manim and
+        # anything it spawns in one killable process group
         process = await asyncio.create_subprocess_exec(
             *cmd,
-            stdout=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
             stderr=asyncio.subprocess.PIPE,
             cwd=temp_dir,
-            env=env
+            env=env,
+            close_fds=False,
+            start_new_session=True
         )
 
-        # Stream output in real-time
-        stdout_lines = []
-        stderr_lines = []
-
-        async def read_stream(stream, is_stderr=False):
-            """Read stream line by line and log output."""
-            lines = stderr_lines if is_stderr else stdout_lines
-
+        # Stream stderr in real-time. Manim emits a progress line per
+        # rendered frame, so a long render can produce megabytes of output;
+        # keep only a bounded tail, which is all the error report needs.
+        stderr_lines = deque(maxlen=200)
+
+        def _log_line(raw: bytes) -> None:
+            decoded_line = raw.decode(errors="replace").rstrip()
+            stderr_lines.append(decoded_line)
+            if decoded_line:
+                logger.debug(decoded_line)
+
+        async def read_stream(stream):
+            """Read the stream in large chunks and log complete lines.
+
+            Fixed-size reads wake the event loop once per chunk instead of
+            once per line, and splitting on \r as well as \n surfaces
+            Manim's carriage-return progress updates as they happen rather
+            than when the line finally completes.
+            """
+            buf = bytearray()
             while True:
-                line = await stream.readline()
-                if not line:
+                chunk = await stream.read(65536)
+                if not chunk:
                     break
+                buf += chunk
+                *lines, tail = buf.replace(b"\r", b"\n").split(b"\n")
+                buf = bytearray(tail)
+                for raw in lines:
+                    _log_line(raw)
+            if buf:
+                _log_line(bytes(buf))
 
-                decoded_line = line.decode().rstrip()
-                lines.append(decoded_line)
-
-                # Log all output
-                if decoded_line:
-                    logger.debug(decoded_line)
-
-        # Read both streams concurrently with timeout
         try:
-            await asyncio.wait_for(
-                asyncio.gather(
-                    read_stream(process.stdout, is_stderr=False),
-                    read_stream(process.stderr, is_stderr=True)
-                ),
-                timeout=timeout
-            )
-        except asyncio.TimeoutError:
+            async with asyncio.timeout(timeout):
+                await read_stream(process.stderr)
+        except TimeoutError:
             logger.warning(f"Rendering process exceeded timeout of {timeout}s")
             raise Exception(f"Video rendering timeout after {timeout} seconds")
 
@@ -190,56 +372,53 @@ async def render_manim_video(
         await process.wait()
         emit_progress("rendering_video", "Manim rendering completed")
 
-        # Decode output for debugging
-        stdout_str = "\n".join(stdout_lines)
-        stderr_str = "\n".join(stderr_lines)
-
         if process.returncode != 0:
-            raise Exception(f"Manim rendering failed (code {process.returncode}):\nSTDOUT: {stdout_str}\nSTDERR: {stderr_str}")
+            stderr_str = "\n".join(stderr_lines)
+            raise Exception(f"Manim rendering failed (code {process.returncode}):\nSTDERR: {stderr_str}")
 
         # Find the output video file - try multiple possible locations
         # Manim output path structure: media/videos/<scriptname>/<quality>/<filename>
-        quality_dirs = {
-            "l": "480p15",
-            "m": "720p30",
-            "h": "1080p60",
-            "p": "1440p60",
-            "k": "2160p60"
-        }
-        quality_dir = quality_dirs.get(quality_settings['quality_flag'], "720p30")
+        quality_dir = _QUALITY_DIRS.get(quality_settings['quality_flag'], "720p30")
 
+        output_name = f"output.{output_format}"
+        videos_dir = os.path.join(media_dir, "videos")
         possible_paths = [
-            Path(temp_dir) / "media" / "videos" / "scene" / quality_dir / f"output.{output_format}",
-            Path(temp_dir) / "media" / "videos" / "scene" / f"output.{output_format}",
-            Path(temp_dir) / "media" / "videos" / f"output.{output_format}",
-            Path(temp_dir) / "media" / f"output.{output_format}",
+            os.path.join(videos_dir, "scene", quality_dir, output_name),
+            os.path.join(videos_dir, "scene", output_name),
+            os.path.join(videos_dir, output_name),
+            os.path.join(media_dir, output_name),
         ]
 
-        # Also search for any files with the right extension
-        media_dir = Path(temp_dir) / "media"
-        if media_dir.exists():
-            found_files = list(media_dir.rglob(f"*.{output_format}"))
-            if found_files:
-                video_path = found_files[0]
-            else:
-                video_path = None
-        else:
-            video_path = None
-
-        # Try predefined paths if search didn't work
-        if not video_path or not video_path.exists():
-            for path in possible_paths:
-                if path.exists():
-                    video_path = path
-                    break
-
-        if not video_path or not video_path.exists():
-            # Debug: list all files in temp_dir
+        # The canonical path (first entry) is deterministic given -o and the
+        # quality preset; check the known candidates with four stats instead
+        # of rglob-walking the whole media tree (Tex/text caches can hold
+        # hundreds of intermediates)
+        video_path = _first_existing(possible_paths)
+
+        if not video_path:
+            # Scan only the expected quality directory for a differently
+            # named output (e.g. scene class naming quirks)
+            expected_dir = os.path.dirname(possible_paths[0])
+            if os.path.isdir(expected_dir):
+                with os.scandir(expected_dir) as entries:
+                    for entry in entries:
+                        if entry.is_file() and entry.name.endswith(f".{output_format}"):
+                            video_path = entry.path
+                            break
+
+        if not video_path:
+            # Failure branch only: full walk, both as a last-resort search
+            # and to list the tree in the error message
             all_files = []
             for root, dirs, files in os.walk(temp_dir):
                 for file in files:
-                    all_files.append(os.path.join(root, file))
-            raise Exception(f"Output video not found. Searched paths: {possible_paths}. Files in temp_dir: {all_files}\n\nManim STDOUT:\n{stdout_str}\n\nManim STDERR:\n{stderr_str}")
+                    full_path = os.path.join(root, file)
+                    all_files.append(full_path)
+                    if video_path is None and file.endswith(f".{output_format}"):
+                        video_path = full_path
+            if not video_path:
+                stderr_str = "\n".join(stderr_lines)
+                raise Exception(f"Output video not found. Searched paths: {possible_paths}. Files in temp_dir: {all_files}\n\nManim STDERR:\n{stderr_str}")
 
         # Add subtitles if requested
         final_video_path = str(video_path)
@@ -263,6 +442,15 @@ async def render_manim_video(
                     mapped_stage = stage_mapping.get(stage, "generating_subtitles")
                     emit_progress(mapped_stage, message)
 
+                # Collect the narration that ran concurrently with the
+                # render; on failure fall back to generating inline
+                segments = None
+                if narration_task is not None:
+                    try:
+                        segments = await narration_task
+                    except Exception as narration_error:
+                        logger.error(f"Pre-generated narration failed: {narration_error}")
+
                 final_video_path = await generate_and_add_subtitles(
                     video_path=str(video_path),
                     code=code,
@@ -275,6 +463,7 @@ async def render_manim_video(
                     audio_language=audio_language,
                     audio_speaker_id=audio_speaker_id,
                     audio_speed=audio_speed,
+                    segments=segments,
                     progress_callback=subtitle_progress_callback
                 )
                 logger.info(f"Subtitle generation completed! New video path: {final_video_path}")
@@ -290,31 +479,12 @@ async def render_manim_video(
             logger.info(f"Subtitles NOT requested: include_subtitles={include_subtitles}, prompt present={bool(prompt)}")
 
         emit_progress("completed", "Video rendering completed successfully")
-        return final_video_path, temp_dir
 
-    except asyncio.CancelledError:
-        # Handle cancellation gracefully
-        logger.warning("Rendering task was cancelled")
-        raise  # Re-raise to allow proper cleanup
+        if render_key:
+            # put() copies a multi-MB file and scans the cache directory;
+            # keep that off the event loop
+            await asyncio.to_thread(render_cache.put, render_key, final_video_path, output_format)
 
-    except Exception as e:
-        # Clean up temp directory on error
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        raise e
-
-    finally:
-        # Ensure subprocess is terminated
-        if process and process.returncode is None:
-            try:
-                logger.info("Terminating rendering subprocess...")
-                process.terminate()
-                try:
-                    # Wait briefly for graceful termination
-                    await asyncio.wait_for(process.wait(), timeout=5.0)
-                except asyncio.TimeoutError:
-                    # Force kill if it doesn't terminate gracefully
-                    logger.warning("Force killing rendering subprocess...")
-                    process.kill()
-                    await process.wait()
-            except Exception as cleanup_error:
-                logger.error(f"Error during subprocess cleanup: {cleanup_error}")
+        # Success: detach cleanup so the caller owns temp_dir (and the video in it)
+        cleanup.pop_all()
+        return final_video_path, temp_dir
@@ -3,18 +3,63 @@ Centralized logging configuration using loguru.
 """
 import sys
 import logging
+from functools import lru_cache
+
 from loguru import logger
 
-# Remove default handler
-logger.remove()
+# Colour markup is only worth parsing when a human terminal will render
+# it; under docker/systemd redirection loguru would parse the tags just
+# to strip them again on every record
+_TTY = sys.stderr.isatty()
+_TAGGED_FORMAT = "<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{extra[context]: <20}</cyan> | <level>{message}</level>"
+_PLAIN_FORMAT = "{time:HH:mm:ss} | {level: <8} | {extra[context]: <20} | {message}"
+
+_CONFIGURED = False
+
+
+def _configure_once() -> None:
+    """
+    Install the stderr sink exactly once per process.
+
+    A re-import under a second module path (or an importlib.reload) would
+    otherwise register a duplicate sink and every log line would be
+    formatted and written twice.
+    """
+    global _CONFIGURED
+    if _CONFIGURED:
+        return
+    _CONFIGURED = True
+
+    # Remove default handler
+    logger.remove()
 
-# Add custom handler with nice formatting
-logger.add(
-    sys.stderr,
-    format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{extra[context]: <20}</cyan> | <level>{message}</level>",
-    level="INFO",
-    colorize=True,
-)
+    # Add custom handler with nice formatting. enqueue=True moves formatting
+    # and the stderr write() onto loguru's background thread, so hot-path
+    # logger calls just enqueue the record instead of blocking on I/O.
+    logger.add(
+        sys.stderr,
+        format=_TAGGED_FORMAT if _TTY else _PLAIN_FORMAT,
+        level="INFO",
+        colorize=_TTY,
+        enqueue=True,
+    )
+
+
+_configure_once()
+
+
+# Resolved once: comparing against a module-level string in the frame walk
+# avoids re-fetching logging.__file__ per intercepted record
+_LOGGING_FILE = logging.__file__
+
+# Mirrors the level passed to logger.add: records below it are dropped
+# before any frame introspection runs. Loguru and stdlib share numeric
+# level values, so stdlib record.levelno compares directly.
+_MIN_LEVEL_NO = logger.level("INFO").no
+
+# levelname -> loguru level name (or numeric fallback), filled on first use;
+# skips the try/except ValueError lookup on every intercepted record
+_LEVEL_BY_NAME: dict = {}
 
 
 class InterceptHandler(logging.Handler):
@@ -24,15 +69,25 @@ class InterceptHandler(logging.Handler):
     """
 
     def emit(self, record: logging.LogRecord) -> None:
-        # Get corresponding Loguru level if it exists
-        try:
-            level = logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
+        # Cheap numeric gate first: high-volume DEBUG noise from httpx,
+        # litellm and friends returns here without paying for the level
+        # lookup or the frame walk below
+        if record.levelno < _MIN_LEVEL_NO:
+            return
 
-        # Find caller from where originated the logged message
+        # Get corresponding Loguru level if it exists (cached per name)
+        level = _LEVEL_BY_NAME.get(record.levelname)
+        if level is None:
+            try:
+                level = logger.level(record.levelname).name
+            except ValueError:
+                level = record.levelno
+            _LEVEL_BY_NAME[record.levelname] = level
+
+        # Find caller from where originated the logged message; the depth
+        # cap guards against pathological stacks of logging-internal frames
         frame, depth = sys._getframe(6), 6
-        while frame and frame.f_code.co_filename == logging.__file__:
+        while frame and frame.f_code.co_filename == _LOGGING_FILE and depth < 26:
             frame = frame.f_back
             depth += 1
 
@@ -53,15 +108,26 @@ def setup_logging():
     logging.root.handlers = [InterceptHandler()]
     logging.root.setLevel("INFO")
 
-    # Remove every other logger's handlers and propagate to root logger
-    for name in logging.root.manager.loggerDict.keys():
-        logging.getLogger(name).handlers = []
-        logging.getLogger(name).propagate = True
+    # Remove every other logger's handlers and propagate to root logger.
+    # Snapshot the names first so the logging module's lock isn't held
+    # across the whole loop (transitive imports like litellm/httpx can
+    # register hundreds of loggers), and skip loggers that are already
+    # handler-free rather than rebuilding their state.
+    names = list(logging.root.manager.loggerDict)
+    for name in names:
+        lg = logging.getLogger(name)
+        if lg.handlers:
+            lg.handlers.clear()
+        lg.propagate = True
 
 
+@lru_cache(maxsize=128)
 def get_logger(context: str):
     """
-    Get a logger with a specific context.
+    Get a logger with a specific context (memoized per context name).
+
+    bind() allocates a fresh Logger wrapper each call; the handful of
+    context names used here are fixed, so each bound logger is built once.
 
     Args:
         context: The context/component name (e.g., "API", "Workflow", "Generate")
@@ -0,0 +1,96 @@
+"""
+Filesystem cache for finished renders.
+
+Users iterate on prompts, so identical (code, format, quality, background)
+tuples recur — regeneration, re-download, quality comparisons. A hit here
+skips the manim subprocess entirely and serves the previous output file.
+Only subtitle-free renders are cached; subtitled outputs are covered by
+the narration artifact cache and depend on more inputs.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from utils.logger import get_logger
+
+logger = get_logger("RenderCache")
+
+CACHE_ROOT = Path(
+    os.getenv("MANIM_GPT_CACHE", str(Path.home() / ".cache" / "manim-gpt"))
+) / "renders"
+
+# Evict least-recently-used entries once the cache exceeds this budget
+MAX_CACHE_BYTES = int(os.getenv("MANIM_GPT_RENDER_CACHE_MB", "2048")) * 1024 * 1024
+
+
+def cache_key(
+    code: str,
+    output_format: str,
+    quality: str,
+    background_color: Optional[str]
+) -> str:
+    """Hash every input that affects the rendered file into a key."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in (code, output_format, quality, background_color or ""):
+        h.update(part.encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def get(key: str, output_format: str) -> Optional[str]:
+    """
+    Return the cached video path for this key, or None on a miss.
+
+    A hit refreshes the entry's mtime so eviction stays least-recently-used.
+    """
+    entry = CACHE_ROOT / f"{key}.{output_format}"
+    try:
+        os.utime(entry)
+    except OSError:
+        return None
+    return str(entry)
+
+
+def put(key: str, video_path: str, output_format: str) -> None:
+    """
+    Store a rendered video atomically (staging copy + rename).
+
+    Cache writes never fail the render; they just log and move on.
+    """
+    try:
+        CACHE_ROOT.mkdir(parents=True, exist_ok=True)
+        fd, staging = tempfile.mkstemp(dir=CACHE_ROOT, suffix=f".{output_format}.tmp")
+        os.close(fd)
+        shutil.copy2(video_path, staging)
+        os.replace(staging, CACHE_ROOT / f"{key}.{output_format}")
+        _evict()
+    except Exception as e:
+        logger.warning(f"Failed to store render cache entry {key}: {e}")
+
+
+def _evict() -> None:
+    """Drop oldest entries until the cache fits the size budget."""
+    entries = []
+    total = 0
+    with os.scandir(CACHE_ROOT) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+    if total <= MAX_CACHE_BYTES:
+        return
+    entries.sort()
+    for mtime, size, path in entries:
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= MAX_CACHE_BYTES:
+            break
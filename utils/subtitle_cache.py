@@ -0,0 +1,109 @@
+"""
+Filesystem cache for generated subtitle and narration artifacts.
+
+Repeat renders of the same code/prompt pair (common while iterating on
+render settings) otherwise pay a full LLM narration round-trip and TTS
+synthesis every time. Entries live under the user cache directory keyed by
+a hash of every input that affects the artifacts, so a hit reduces the
+subtitle pipeline to a couple of file copies.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger("SubtitleCache")
+
+CACHE_ROOT = Path(
+    os.getenv("MANIM_GPT_CACHE", str(Path.home() / ".cache" / "manim-gpt"))
+) / "subtitles"
+
+SEGMENTS_FILE = "segments.json"
+SRT_FILE = "subtitles.srt"
+AUDIO_FILE = "narration.wav"
+
+
+def cache_key(
+    code: str,
+    prompt: str,
+    model: str,
+    enable_audio: bool,
+    audio_language: str,
+    audio_speaker_id: int,
+    audio_speed: float
+) -> str:
+    """Hash every input that affects the generated artifacts into a key."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in (
+        code,
+        prompt,
+        model,
+        str(enable_audio),
+        audio_language,
+        str(audio_speaker_id),
+        f"{audio_speed:.2f}",
+    ):
+        h.update(part.encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def get(key: str, require_audio: bool = False) -> Optional[Path]:
+    """
+    Return the cache entry directory for this key, or None on a miss.
+
+    Args:
+        key: Key from cache_key()
+        require_audio: Only count the entry as a hit if it holds narration
+            audio as well as the SRT/segments
+
+    Returns:
+        Path to the entry directory, or None
+    """
+    entry = CACHE_ROOT / key
+    if not (entry / SEGMENTS_FILE).is_file() or not (entry / SRT_FILE).is_file():
+        return None
+    if require_audio and not (entry / AUDIO_FILE).is_file():
+        return None
+    return entry
+
+
+def load_segments(entry: Path) -> List[dict]:
+    """Load the narration segments stored in a cache entry."""
+    with open(entry / SEGMENTS_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def put(
+    key: str,
+    segments: List[dict],
+    srt_path: str,
+    audio_path: Optional[str] = None
+) -> None:
+    """
+    Store artifacts for this key atomically (staging dir + rename).
+
+    A concurrent writer racing on the same key loses the rename and its
+    staging copy is discarded; cache writes never fail the render, they
+    just log and move on.
+    """
+    try:
+        CACHE_ROOT.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=CACHE_ROOT, prefix=f".{key}-"))
+        with open(staging / SEGMENTS_FILE, "w", encoding="utf-8") as f:
+            json.dump(segments, f)
+        shutil.copy2(srt_path, staging / SRT_FILE)
+        if audio_path:
+            shutil.copy2(audio_path, staging / AUDIO_FILE)
+        try:
+            os.rename(staging, CACHE_ROOT / key)
+        except OSError:
+            # Entry already exists (another writer won the race)
+            shutil.rmtree(staging, ignore_errors=True)
+    except Exception as e:
+        logger.warning(f"Failed to store subtitle cache entry {key}: {e}")